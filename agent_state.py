@@ -0,0 +1,184 @@
+""" The agents' model of the board, kept as parallel arrays.
+
+    Every agent tracks what it knows about each cell in (dim, dim) arrays
+    instead of a grid of Cell objects, so full-board scans are mask
+    operations and a cell costs a few bytes:
+
+        agent.covered       bool   not excavated yet (BasicAgent also clears
+                                   it when it flags a cell)
+        agent.flag          bool   flagged by the agent
+        agent.safe          int8   UNKNOWN, UNSAFE or SAFE
+        agent.mine_count    int8   what the board returned when the cell was
+                                   excavated: MINE, FOG or the mine count.
+                                   HIDDEN until then
+        agent.idx           int    the cell's variable in the knowledge base,
+                                   1 to dim * dim in row-major order (CNF
+                                   agents only)
+
+    agent.cells is a CellGrid over those arrays for debugging.  It prints as
+    the grid of "?", "F", counts and "M" the Cell objects used to print, and
+    agent.cells[i, j] is a Cell with the old attributes, read from and
+    written to the arrays.
+"""
+import numpy as np
+
+
+# Values of agent.safe
+UNKNOWN, UNSAFE, SAFE = -1, 0, 1
+
+# Values of agent.mine_count besides the counts.  HIDDEN is
+#  Board.hidden_value, MINE and FOG what the board returns
+HIDDEN, MINE, FOG = -4, -1, -2
+
+
+
+
+def new_state(dim, idx=False):
+    """ Returns (covered, flag, safe, mine_count) arrays of a dim x dim board
+        nothing is known about, followed by idx if idx is True
+    """
+    state = (np.ones((dim, dim), dtype=bool),
+             np.zeros((dim, dim), dtype=bool),
+             np.full((dim, dim), UNKNOWN, dtype=np.int8),
+             np.full((dim, dim), HIDDEN, dtype=np.int8))
+
+    if idx:
+        state += (np.arange(1, dim * dim + 1).reshape(dim, dim),)
+    return state
+
+
+
+
+class Cell():
+    """ Cell (i, j) of an agent's arrays, with the attributes of the old Cell
+        objects: covered, flag, safe (None, False or True), mine (True or
+        None), mine_count (None while unknown, '?' when fogged) and idx.
+        hidden_neighbors is read from the agent's hidden_neighbors() on
+        agents that have it, BasicAgent among them.  Any other per-cell
+        array of the agent reads as an attribute too
+    """
+
+    __slots__ = ('_agent', '_at')
+
+    def __init__(self, agent, i, j):
+        self._agent = agent
+        self._at = (i, j)
+
+
+    @property
+    def covered(self):
+        return bool(self._agent.covered[self._at])
+
+    @covered.setter
+    def covered(self, value):
+        self._agent.covered[self._at] = value
+
+
+    @property
+    def flag(self):
+        return bool(self._agent.flag[self._at])
+
+    @flag.setter
+    def flag(self, value):
+        self._agent.flag[self._at] = bool(value)
+
+
+    @property
+    def safe(self):
+        value = self._agent.safe[self._at]
+        return None if value == UNKNOWN else bool(value)
+
+    @safe.setter
+    def safe(self, value):
+        self._agent.safe[self._at] = UNKNOWN if value is None else SAFE if value else UNSAFE
+
+
+    @property
+    def mine(self):
+        return True if self._agent.mine_count[self._at] == MINE else None
+
+
+    @property
+    def mine_count(self):
+        value = self._agent.mine_count.item(self._at)
+        if value == HIDDEN or value == MINE:
+            return None
+        return '?' if value == FOG else value
+
+    @mine_count.setter
+    def mine_count(self, value):
+        self._agent.mine_count[self._at] = HIDDEN if value is None else \
+                                           FOG if value == '?' else value
+
+
+    @property
+    def hidden_neighbors(self):
+        counts = getattr(self._agent, 'hidden_neighbors', None)
+        if counts is None:
+            raise AttributeError('hidden_neighbors')
+        return int(counts()[self._at])
+
+
+    def __getattr__(self, name):
+        grid = getattr(self._agent, name, None)
+        if not isinstance(grid, np.ndarray) or grid.shape != self._agent.covered.shape:
+            raise AttributeError(name)
+        return grid.item(self._at)
+
+
+    def __str__(self):
+
+        if self.flag:
+            return "F"
+
+        if self.covered:
+            return "?"
+
+        if self.mine_count is not None:
+            return str(self.mine_count)
+
+        if self.mine:
+            return 'M'
+
+        else:
+            return "err"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+
+
+class CellGrid():
+    """ The cells of an agent, indexed like the old np.zeros((dim, dim),
+        dtype=Cell) grid.  See the module docstring
+    """
+
+    def __init__(self, agent):
+        self._agent = agent
+
+
+    @property
+    def shape(self):
+        return self._agent.covered.shape
+
+
+    def __getitem__(self, key):
+        i, j = key
+        return Cell(self._agent, i, j)
+
+
+    def grid(self):
+        """ Returns an object array of the Cell of every (i, j)
+        """
+        out = np.empty(self.shape, dtype=object)
+        for i, j in np.ndindex(*self.shape):
+            out[i, j] = Cell(self._agent, i, j)
+        return out
+
+
+    def __str__(self):
+        return str(self.grid())
+
+    def __repr__(self):
+        return repr(self.grid())
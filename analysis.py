@@ -1,56 +1,66 @@
+import os
 import numpy as np
+from importlib import import_module
 
 import board as board
 import jerk_board as jerk_board
+import batch_board as batch_board
+import seeding
+import corpus
+import replay
 
-import basic_agent
-import smartypants_agent
-import cnf_agent
-import cnf_bonus_agent
 
-import matplotlib.pyplot as plt
+# Agent class of each agent_type, as (module, class name).  Looked up on 
+#  first use, so a worker only imports the agent it plays, and pycosat only 
+#  comes in with the CNF agents 
+agent_types = {
+    'basic': ('basic_agent', 'BasicAgent'), 
+    'smarty': ('smartypants_agent', 'SmartypantsAgent'), 
+    'cnf': ('cnf_agent', 'CNF_Agent'), 
+    'cnf_bonus': ('cnf_bonus_agent', 'CNF_Bonus_Agent'), 
+}
 
 
 
 
-def generate_score_vs_density_list(dim, runs_per_x, x_interval=1, agent_type='basic'):
+def generate_score_vs_density_list(dim, runs_per_x, x_interval=1, agent_type='basic', 
+                                   seed=None, processes=None, log_dir=None):
     """ Generates a list of performance vs mine count for analysis 
     
         Agents supported are:  'basic', 'smarty', 'cnf'
 
+        Every run gets its own SeedSequence spawned from seed, which seeds 
+        its board and its agent.  processes=N plays the runs on a pool of N 
+        worker processes.  The result is the same as a serial sweep with the 
+        same seed, down to the last bit 
+
+        log_dir saves a replay log of every run there, named by the run's 
+        index (see replay.py).  replay.replay() rebuilds any game of the sweep 
+        on its own, e.g. to profile the one that took much longer than the rest 
     """
 
     # Determine what kind of agent we are assessing 
-    if agent_type.lower() == 'basic':
-        def new_agent(brd): 
-            return basic_agent.BasicAgent(brd)
-    elif agent_type.lower() == 'smarty':
-        def new_agent(brd): 
-            return smartypants_agent.SmartypantsAgent(brd)
-    elif agent_type.lower() == 'cnf':
-        def new_agent(brd): 
-            return cnf_agent.CNF_Agent(brd) 
-    else: 
-        ValueError('Did not recognize agent type {}'.format(agent_type))
+    if agent_type.lower() not in ('basic', 'smarty', 'cnf'): 
+        raise ValueError('Did not recognize agent type {}'.format(agent_type))
 
 
     out = []
     counts = np.arange(1, dim**2-1)
     counts = counts[::x_interval]
 
-    for mine_count in counts: 
+    seeds = seeding.spawn(seed, len(counts) * runs_per_x)
+    runs = [(dim, int(mine_count), None, agent_type.lower(), seeds[k * runs_per_x + r], None) 
+            for k, mine_count in enumerate(counts) for r in range(runs_per_x)]
+    results = _play_all(runs, processes, log_dir)
+
+    for k, mine_count in enumerate(counts): 
         
         density_score = 0
         random_clicks = 0 
         
-        for i in range(runs_per_x): 
-        
-            brd = board.Board(dim, mine_count) 
-            agent = new_agent(brd) 
-            agent.solve()
-            
-            density_score += brd.score
-            random_clicks += agent.random_clicks 
+        for score, clicks in results[k * runs_per_x:(k + 1) * runs_per_x]: 
+            density_score += score
+            random_clicks += clicks 
         
         out.append((mine_count, density_score/runs_per_x, random_clicks/runs_per_x))
 
@@ -58,31 +68,187 @@ def generate_score_vs_density_list(dim, runs_per_x, x_interval=1, agent_type='ba
 
 
 
-def generate_score_vs_prob_list(dim, mine_count, num_x=10, runs_per_x=1):
+def generate_score_vs_density_list_batched(dim, runs_per_x, x_interval=1, seed=None):
+    """ Batched version of generate_score_vs_density_list() for the basic agent.
+
+        Every run of every mine count is one game of a single BatchBoard, and 
+        basic_agent.BatchBasicAgent steps all of them in lockstep.  The board 
+        and the agent get their own streams spawned from seed 
+    """
+
+    counts = np.arange(1, dim**2-1)
+    counts = counts[::x_interval]
+
+    # runs_per_x consecutive games share a mine count 
+    from basic_agent import BatchBasicAgent
+
+    board_seed, agent_seed = seeding.spawn(seed, 2)
+    brd = batch_board.BatchBoard(len(counts) * runs_per_x, dim, np.repeat(counts, runs_per_x), 
+                                 rng=board_seed)
+    agent = BatchBasicAgent(brd, rng=agent_seed)
+    agent.solve()
+
+    scores = brd.score.reshape(len(counts), runs_per_x).mean(axis=1)
+    random_clicks = agent.random_clicks.reshape(len(counts), runs_per_x).mean(axis=1)
+
+    return list(zip(counts, scores, random_clicks))
+
+
+
+def generate_score_vs_prob_list(dim, mine_count, num_x=10, runs_per_x=1, seed=None, 
+                                processes=None, corpus_path=None, log_dir=None):
     """ Generates al ist of performance vs fog_probability for analysis.
         This is for the bonus section 
 
         The only agent currently supported is the CNF_Bonus_Agent 
+
+        seed, processes and log_dir work as in generate_score_vs_density_list() 
+
+        The x-values use common random numbers: run r plays the same board, 
+        with the same fog rolls and the same agent seed, at every probability.  
+        JerkBoard fogs a cell when its pre-sampled roll is under the 
+        probability, so the points of a curve differ only by that threshold 
+        and the curve needs far fewer runs_per_x to come out smooth.  
+
+        With corpus_path, run r of every probability plays layout r of that 
+        corpus file (see corpus.py), so all probabilities are scored on the 
+        same boards.  dim and mine_count must match the corpus 
     """
 
 
     out = []
     probs = np.linspace(0, 1, num_x)
 
-    for prob in probs: 
+    layouts = [None] * runs_per_x
+    if corpus_path is not None: 
+        _check_corpus(corpus_path, dim, mine_count, runs_per_x)
+        layouts = [(corpus_path, r) for r in range(runs_per_x)]
+
+    seeds = seeding.spawn(seed, runs_per_x)
+    runs = [(dim, mine_count, float(prob), 'cnf_bonus', seeds[r], layouts[r]) 
+            for prob in probs for r in range(runs_per_x)]
+    results = _play_all(runs, processes, log_dir)
+
+    for k, prob in enumerate(probs): 
         density_score = 0
         random_clicks = 0 
         
-        for i in range(runs_per_x): 
-        
-            brd = jerk_board.JerkBoard(dim, mine_count, prob) 
-            agent = cnf_bonus_agent.CNF_Bonus_Agent(brd) 
-            agent.solve()
-            
-            density_score += brd.score
-            random_clicks += agent.random_clicks 
+        for score, clicks in results[k * runs_per_x:(k + 1) * runs_per_x]: 
+            density_score += score
+            random_clicks += clicks 
         
         out.append((prob, density_score/runs_per_x, random_clicks/runs_per_x))
 
     return out 
 
+
+
+def generate_score_on_corpus(corpus_path, agent_type='basic', n=None, seed=None, 
+                             processes=None, log_dir=None): 
+    """ Plays the first n layouts of a corpus file (all of them by default) 
+        and returns the (score, random_clicks) of each game, in order.  
+
+        Every agent scored on the same corpus sees exactly the same boards, 
+        so this is the benchmark for comparing agents.  seed only drives the 
+        agents' random clicks.  Worker processes share the memory-mapped 
+        corpus through the page cache.  log_dir works as in 
+        generate_score_vs_density_list() 
+    """
+    if agent_type.lower() not in ('basic', 'smarty', 'cnf'): 
+        raise ValueError('Did not recognize agent type {}'.format(agent_type))
+
+    records = corpus.load_corpus(corpus_path)
+    n = len(records) if n is None else n 
+    if n > len(records): 
+        raise ValueError("Corpus {} holds only {} layouts".format(corpus_path, len(records)))
+
+    dim = records.dtype['mines'].shape[0]
+    seeds = seeding.spawn(seed, n)
+    runs = [(dim, int(records['num_mines'][k]), None, agent_type.lower(), seeds[k], 
+             (corpus_path, k)) for k in range(n)]
+    return _play_all(runs, processes, log_dir)
+
+
+
+def _check_corpus(corpus_path, dim, mine_count, n): 
+    records = corpus.load_corpus(corpus_path)
+    if records.dtype['mines'].shape[0] != dim or len(records) < n: 
+        raise ValueError("Corpus {} does not hold {} layouts of a {}x{} board".format(
+            corpus_path, n, dim, dim))
+    if np.any(records['num_mines'][:n] != mine_count): 
+        raise ValueError("Corpus {} does not have {} mines per layout".format(
+            corpus_path, mine_count))
+
+
+
+# Board kept by each process between runs, keyed by (dim, fog or not).  
+#  Runs reset() it instead of building a new board 
+_boards = dict()
+
+
+
+def _play(run): 
+    """ Plays one game.  run is (dim, mine_count, fog_probability, agent_type, 
+        seed, layout, log_path).  A fog_probability other than None plays on a 
+        JerkBoard.  layout is None for a random board or (corpus path, k).  
+        log_path, if not None, is where the game's replay log is saved.  
+        Returns (score, random_clicks) 
+    """
+    dim, mine_count, prob, agent_type, seed, layout, log_path = run 
+    board_seed, agent_seed = seeding.spawn(seed, 2)
+    mines = None if layout is None else corpus.layout(*layout)
+
+    key = (dim, prob is not None)
+    brd = _boards.get(key)
+    if brd is None: 
+        if prob is None: 
+            brd = board.Board(dim, mine_count, headless=True, rng=board_seed, mines=mines) 
+        else: 
+            brd = jerk_board.JerkBoard(dim, mine_count, prob, headless=True, rng=board_seed, 
+                                       mines=mines) 
+        _boards[key] = brd 
+    elif prob is None: 
+        brd.reset(num_mines=mine_count, seed=board_seed, mines=mines)
+    else: 
+        brd.reset(num_mines=mine_count, fog_probability=prob, seed=board_seed, mines=mines)
+
+    log = None if log_path is None else replay.GameLog(brd)
+
+    agent = _agent_class(agent_type)(brd, rng=agent_seed)
+    agent.solve()
+
+    if log is not None: 
+        log.close()
+        log.save(log_path)
+    return brd.score, agent.random_clicks 
+
+
+
+def _agent_class(agent_type): 
+    """ Returns the agent class of agent_type, importing its module the first 
+        time.  See agent_types 
+    """
+    module, name = agent_types[agent_type]
+    return getattr(import_module(module), name)
+
+
+
+def _play_all(runs, processes=None, log_dir=None): 
+    """ Plays every run, on a pool of worker processes if processes is given.  
+        Results come back in the order of runs.  With log_dir, run k saves its 
+        replay log to log_dir/game-k.msrl 
+    """
+    if log_dir is not None: 
+        os.makedirs(log_dir, exist_ok=True)
+        runs = [run + (os.path.join(log_dir, 'game-{:06d}.msrl'.format(k)),) 
+                for k, run in enumerate(runs)]
+    else: 
+        runs = [run + (None,) for run in runs]
+
+    if not processes: 
+        return [_play(run) for run in runs]
+
+    # Imported here so workers, which only run _play(), never load it 
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(processes) as pool: 
+        return list(pool.map(_play, runs, chunksize=max(1, len(runs) // (4 * processes))))
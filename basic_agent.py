@@ -1,58 +1,32 @@
 import numpy as np 
-import board as board 
+from seeding import as_generator
+from neighbor_table import neighbor_table
+from batch_board import neighbor_sum 
+from agent_state import new_state, CellGrid, UNSAFE, SAFE, MINE 
 from time import sleep 
 
 
-class Cell(): 
-    covered = True 
-    mine = None 
-    mine_count = None 
-    flag = None 
-    safe = None 
-    total_neighbors = 8 
-    hidden_neighbors = 8 
-    safe_neighbors_identified = 0 
-
-    def __str__(self):
-        
-        if self.flag: 
-            return "F"
-            
-        if self.covered: 
-            return "?"
-
-        if self.mine_count is not None: 
-            return str(self.mine_count)
-        
-
-        if self.mine: 
-            return 'M' 
-
-        else: 
-            return "err"
-
-    def __repr__(self): 
-        return self.__str__() 
-
-
-
 class BasicAgent():
     """Basic agent for solving minesweeper.  
     """
 
 
 
-    def __init__(self, board): 
+    def __init__(self, board, rng=None): 
         
         # Environment/board attribute of agent.  
         self._board = board 
         #   The only allowed interfaces to this object are: 
-        #       .user_select(i, j)
+        #       .user_select(i, j, cascade=False)
         #       .user_flag(i, j)
+        #       .user_select_many(coords, cascade=False)
+        #       .user_flag_many(coords)
+        #       .observation()  (read-only visible, excavated and flag grids)
         #       .check_gameover_conditions()
         #       .score 
         #       .dim 
         #       .num_mines 
+        #       .torus 
         #   Other attribute or functions accesses are illegal and cheating  
         #    e.g The agent cannot access board.cells or board.excavated   
 
@@ -62,26 +36,17 @@ class BasicAgent():
         self.dim = self._board.dim 
         self.num_mines = self._board.num_mines 
 
-        # Initialize agent's internal model of the board  
-        self.cells = np.zeros((self.dim, self.dim), dtype=Cell)
+        # Neighbors of every cell, shared with the board.  See neighbor_table.py 
+        self.neighbors = neighbor_table(self.dim, self._board.torus)
 
-        for i in range(self.dim): 
-            for j in range(self.dim): 
-                self.cells[i, j] = Cell() 
+        # Agent's own random generator for random clicks.  A seed or an 
+        #  np.random.Generator.  See seeding.py 
+        self.rng = as_generator(rng)
 
-                # Edge cells have 5 neighbors 
-                if (i == 0) or (j == 0) or (i == self.dim-1) or (j == self.dim-1): 
-                    self.cells[i, j].hidden_neighbors = 5
-                    self.cells[i, j].total_neighbors = 5 
-
-
-                # Corner cells have 3 neighbors 
-                if (i == 0 and j == 0) or \
-                   (i == self.dim-1 and j == 0) or \
-                   (i == 0 and j == self.dim-1) or \
-                   (i == self.dim-1 and j == self.dim-1):
-                    self.cells[i, j].hidden_neighbors = 3
-                    self.cells[i, j].total_neighbors = 3 
+        # Initialize agent's internal model of the board, one array per cell 
+        #  attribute.  agent.cells prints it.  See agent_state.py 
+        self.covered, self.flag, self.safe, self.mine_count = new_state(self.dim)
+        self.cells = CellGrid(self)
 
 
         # Metric for random clicks done 
@@ -94,14 +59,7 @@ class BasicAgent():
         """
 
         self._board.user_flag(i, j)
-        
-        # Flag currently present 
-        if self.cells[i, j].flag: 
-            self.cells[i, j].flag = False     
-
-        # Flag currently not present 
-        else: 
-            self.cells[i, j].flag = True 
+        self.flag[i, j] = not self.flag[i, j]
 
 
 
@@ -115,231 +73,279 @@ class BasicAgent():
         """
 
         # If flagged, cannot excavate 
-        if self.cells[i, j].flag: 
+        if self.flag[i, j]: 
+            return False 
+
+        # Zero cells cascade on the board.  Learn from every revealed cell 
+        for (r, c, value) in self._board.user_select(i, j, cascade=True): 
+            self.update_excavated_cell(r, c, value, log)
+
+        return True 
+
+
+
+    def excavate_cells(self, coords, log=False): 
+        """Digs up every cell in coords with a single user_select_many() call 
+        to the board, then updates internal structures for every cell revealed, 
+        including those opened by the zero cascade.
+
+        Returns true if any cell was excavated 
+        """
+
+        # Flagged cells cannot be excavated 
+        coords = [(i, j) for (i, j) in coords if not self.flag[i, j]]
+        if not coords: 
             return False 
 
-        value = self._board.user_select(i, j)
-        self.cells[i, j].covered = False    
+        revealed = self._board.user_select_many(coords, cascade=True)
+        for (r, c, value) in revealed: 
+            self.update_excavated_cell(r, c, value, log)
+
+        return True 
+
+
+
+    def update_excavated_cell(self, i, j, value, log=False): 
+        """Updates internal structures with the value returned by the board for 
+        excavating (i, j).
+
+        Returns true 
+        """
+
+        self.covered[i, j] = False    
+        self.mine_count[i, j] = value 
 
         # Hit a mine 
-        if value == -1: 
-            self.cells[i, j].mine = True 
-            self.cells[i, j].safe = False 
+        if value == MINE: 
+            self.safe[i, j] = UNSAFE 
             if log: print("Excavated a mine at ({}, {})".format(i, j))
         
         else: 
         # Did not hit a mine 
-            self.cells[i, j].mine_count = value
             if log: print("Excavated ({}, {})".format(i, j))
 
+        return True 
 
-            # Decrement hidden_neighbors count for all neighbors 
-            #   and increment safe_neighbors count for all neighbors  
-            neighbors = [(i+1, j+1), (i+1, j), (i, j+1), (i-1, j+1), \
-                         (i-1, j-1), (i-1, j), (i, j-1), (i+1, j-1)]
-            for neighbor in neighbors: 
-                # The neighbor is within bounds of the board 
-                if (0 <= neighbor[0] < self.dim) and (0 <= neighbor[1] < self.dim): 
-                    self.cells[neighbor].hidden_neighbors -= 1
-                    self.cells[neighbor].safe_neighbors_identified += 1
 
 
-        return True 
+    def hidden_neighbors(self): 
+        """Returns the number of neighbors of every cell that are not yet known 
+        to be safe: covered, flagged or an excavated mine.  
+        """
 
+        safe_neighbors_identified = self.neighbors.sum(~self.covered & ~self.flag 
+                                                       & (self.mine_count != MINE))
+        return self.neighbors.degree - safe_neighbors_identified
 
 
-    def surrounding_safe(self, i, j, log=False): 
-        """If, for a given cell, the total number of safe neighbors (8 - clue) 
-        minus the number of revealed safe neighbors is the number of hidden 
-        neighbors, every hidden neighbor is safe.
 
-        In this case, all hidden_neighbors of (i, j) are marked .safe=True 
+    def uncover_all_safe_cells(self, log=False):
+        """ Excavate every covered cell marked safe 
 
-        Returns True if all surrounding hidden cells can be marked as safe.  
-        False otherwise.  
+           Returns True if any cell was excavated 
         """
 
-        cell = self.cells[i, j]
-
-        if cell.flag: 
-            return False 
-
-        if cell.mine: 
-            return False 
+        coords = np.argwhere(self.covered & (self.safe == SAFE))
 
+        # Excavate them all in one batch 
+        return self.excavate_cells(coords.tolist(), log) 
 
-        made_progress = False 
-        total_safe_neighbors = cell.total_neighbors - cell.mine_count 
-        remaining_safe_neighbors = total_safe_neighbors - cell.safe_neighbors_identified
 
-        # If the remaining uncovered neighbor count == number of safe neighbrs left 
-        #   then all remaining uncovered neighbors are safe.  
-        if remaining_safe_neighbors == cell.hidden_neighbors: 
 
-            neighbors = [(i+1, j+1), (i+1, j), (i, j+1), (i-1, j+1), \
-                         (i-1, j-1), (i-1, j), (i, j-1), (i+1, j-1)]
 
-            for neighbor in neighbors: 
-                # The neighbor is within bounds of the board 
-                if (0 <= neighbor[0] < self.dim) and (0 <= neighbor[1] < self.dim): 
+    def mark_safe_cells(self, log=False): 
+        """ Mark the covered neighbors of every excavated cell as safe if all 
+            its hidden neighbors are safe.  The total number of safe neighbors 
+            (neighbors - clue) minus the revealed ones is then the number of 
+            hidden neighbors, which holds exactly when the clue is 0.  
 
-                    # The neighbor is covered 
-                    if self.cells[neighbor].covered == True: 
+            Returns True if any covered cell was marked safe 
+        """
 
-                        # This cell is safe.  Mark it as safe 
-                        self.cells[neighbor].safe = True 
-                        if log: print("Cell ({}, {}) deemed safe using ({}, {}).".format(neighbor[0], neighbor[1], i, j))
-                        made_progress = True 
+        sources = ~self.covered & (self.mine_count == 0)
+        targets = self.covered & (self.neighbors.sum(sources) > 0)
 
-            return made_progress 
-        return False 
+        if log: 
+            for (i, j) in np.argwhere(sources): 
+                for (r, c) in self.neighbors.of(i, j): 
+                    if targets[r, c]: 
+                        print("Cell ({}, {}) deemed safe using ({}, {}).".format(r, c, i, j))
 
+        self.safe[targets] = SAFE 
+        return bool(targets.any())
 
 
-    def surrounding_mines(self, i, j, log=False): 
-        """If, for a given cell, the total number of mines (the clue) minus the 
-        number of revealed mines is the number of hidden neighbors, every 
-        hidden neighbor is a mine
 
-        In this case, all hidden_neighbors of (i, j) are flagged.
+    def mark_mine_cells(self, log=False): 
+        """ Flag every covered neighbor of an excavated cell whose clue equals 
+            its number of hidden neighbors 
 
-        Returns True if all surrounding hidden cells are identified as mines.
-        False otherwise. 
+            Returns True if any cell was flagged 
         """
 
-        cell = self.cells[i, j]
-        made_progress = False 
-
-        if cell.hidden_neighbors == cell.mine_count: 
+        sources = ~self.covered & (self.mine_count >= 0) & (self.hidden_neighbors() == self.mine_count)
+        targets = self.covered & (self.neighbors.sum(sources) > 0)
 
+        if log: 
+            for (i, j) in np.argwhere(sources): 
+                for (r, c) in self.neighbors.of(i, j): 
+                    if targets[r, c]: 
+                        print("Cell ({}, {}) deduced to be a mine using ({}, {})".format(r, c, i, j))
 
-            neighbors = [(i+1, j+1), (i+1, j), (i, j+1), (i-1, j+1), \
-                         (i-1, j-1), (i-1, j), (i, j-1), (i+1, j-1)]
+        # Set them all to flagged in agent's data structures, then on the 
+        #  game board in one batch 
+        mines = np.argwhere(targets)
+        self.flag[targets] = True 
+        self.covered[targets] = False 
+        if len(mines): 
+            self._board.user_flag_many(mines)
 
-            for neighbor in neighbors: 
-                # The neighbor is within bounds of the board 
-                if (0 <= neighbor[0] < self.dim) and (0 <= neighbor[1] < self.dim): 
+        return len(mines) > 0 
 
-                    # The neighbor is covered 
-                    if self.cells[neighbor].covered == True: 
 
-                        # This is a mine.
-                        #   Set it to flagged in agent's data structures 
-                        self.cells[neighbor].flag = True 
-                        self.cells[neighbor].covered = False 
 
-                        #   Set it to a mine in the game board
-                        self._board.user_flag(neighbor[0], neighbor[1])
 
-                        if log: print("Cell ({}, {}) deduced to be a mine using ({}, {})".format(neighbor[0], neighbor[1], i, j))
-                        made_progress = True 
+    def solve(self, interactive=False, log=False, delay=0, recorder=None): 
 
-            return made_progress
-        return False 
 
+        self.excavate_cell(0, 0)
 
+        while(True):
 
+            if interactive:
+                input("Press Enter to continue...")
 
-    def uncover_all_safe_cells(self, log=False):
-        """ Loop through all cells on the board and excavate any uncovered 
-           cell marked safe
+            safe_check = self.mark_safe_cells(log)
+            mine_check = self.mark_mine_cells(log)
+            uncover_try = self.uncover_all_safe_cells(log)
 
-           Returns True if any of the excavate_cell calls was successful 
-        """
 
-        success = False 
+            # Queue this step's changes for the recorder (see recorder.py) 
+            if recorder is not None: 
+                recorder.capture()
 
-        for i in range(self.dim): 
-            for j in range(self.dim): 
+            if(self._board.check_gameover_conditions()): 
+                return self._board.score 
 
-                if self.cells[i, j].covered and self.cells[i, j].safe: 
-                    ret = self.excavate_cell(i, j, log) 
-                    if ret: 
-                        success = True 
+            # If nothing was accomplished on this iteration, reveal some 
+            #  random covered cell 
+            if not safe_check and not mine_check and not uncover_try: 
+                i, j = divmod(int(self.rng.choice(np.flatnonzero(self.covered))), self.dim)
+                if log: print("\tRandomly selected ({}, {}) to uncover.".format(i, j))
+                self.excavate_cell(i, j) 
+                self.random_clicks += 1 
 
-        return success 
 
 
+            # Draw and delay so that we can watch on the GUI.  Skipped when
+            #  the board has no figure (headless or closed) 
+            if self._board.fig is not None: 
+                self._board.draw()
+                sleep(delay) 
 
 
-    def mark_safe_cells(self, log=False): 
-        """ Loop through all uncovered cells and mark their neighbors as safe 
-            if all neighbors are safe 
+        return self._board.score
 
-            Returns True if any of the surrounding_safe calls was successful 
-        """
 
-        success = False 
 
-        for i in range(self.dim): 
-            for j in range(self.dim): 
+class BatchBasicAgent():
+    """Basic agent that plays every game of a batch_board.BatchBoard in lockstep.
 
-                if not self.cells[i, j].covered: 
-                    ret = self.surrounding_safe(i, j, log) 
-                    if ret: 
-                        success = True 
-        return success
+    It applies the same two local rules as BasicAgent, but evaluates them for 
+    every cell of every game at once with neighbor sums: 
+        + If a cell's remaining mine count equals its hidden neighbors, all 
+          of them are mines 
+        + If a cell's mine count is 0, all hidden neighbors are safe.  Like 
+          BasicAgent.mark_safe_cells() this does not fire on a cell whose 
+          mines are all flagged, so a batched sweep matches the serial one 
+    Games where neither rule applies get a random click on the same step.  
+    """
 
 
 
-    def mark_mine_cells(self, log=False): 
-        """ Loop through all uncovered cells and flag their neighbors 
-            if all neighbors are identified as mines 
+    def __init__(self, batch, rng=None): 
 
-            Returns True if any of the surrounding_mines calls was successful 
-        """
+        # Environment/batch attribute of agent.  
+        self._board = batch 
+        #   The only allowed interfaces to this object are: 
+        #       .select(batch_idx, i, j)
+        #       .flag(batch_idx, i, j)
+        #       .gameover()
+        #       .score 
+        #       .n 
+        #       .dim 
+        #       .skipped_value 
 
-        success = False 
+        self.n = self._board.n 
+        self.dim = self._board.dim 
 
-        for i in range(self.dim): 
-            for j in range(self.dim): 
+        # Agent's model of every game.  mine_count holds -2 while a cell is 
+        #  covered and -1 for an excavated mine 
+        self.covered = np.ones((self.n, self.dim, self.dim), dtype=bool)
+        self.flag = np.zeros((self.n, self.dim, self.dim), dtype=bool)
+        self.mine_count = np.full((self.n, self.dim, self.dim), -2, dtype=np.int8)
 
-                if not self.cells[i, j].covered: 
-                    ret = self.surrounding_mines(i, j, log) 
-                    if ret: 
-                        success = True 
-        return success
+        # Metric for random clicks done, per game 
+        self.random_clicks = np.zeros(self.n, dtype=int)
 
+        # Agent's own random generator for random clicks.  See seeding.py 
+        self.rng = as_generator(rng)
 
 
 
-    def solve(self, interactive=False, log=False, delay=0): 
+    def excavate_cells(self, batch_idx, i, j): 
+        """Digs up cell (i, j) of game batch_idx for every entry of the arrays 
+        and records the revealed values 
+        """
+        values = self._board.select(batch_idx, i, j)
 
+        ok = (values != self._board.skipped_value)
+        batch_idx, i, j = batch_idx[ok], i[ok], j[ok]
+        self.covered[batch_idx, i, j] = False 
+        self.mine_count[batch_idx, i, j] = values[ok]
 
-        self.excavate_cell(0, 0)
 
-        while(True):
 
-            if interactive:
-                input("Press Enter to continue...")
+    def solve(self): 
+        """Plays all games to the end.  Returns the array of scores 
+        """
 
-            safe_check = self.mark_safe_cells(log)
-            mine_check = self.mark_mine_cells(log)
-            uncover_try = self.uncover_all_safe_cells(log)
+        games = np.arange(self.n)
+        self.excavate_cells(games, np.zeros(self.n, dtype=int), np.zeros(self.n, dtype=int))
 
+        while(True): 
 
-            if(self._board.check_gameover_conditions()): 
+            done = self._board.gameover()
+            if done.all(): 
                 return self._board.score 
 
-            # If nothing was accomplished on this iteration, reveal some 
-            #  random cell 
-            if not safe_check and not mine_check and not uncover_try: 
-                done = False 
-                while (not done): 
-
-                    i, j = np.random.randint(0, self.dim, size=2)
-                    if self.cells[i, j].covered: 
-                        if log: print("\tRandomly selected ({}, {}) to uncover.".format(i, j))
-                        self.excavate_cell(i, j) 
-                        self.random_clicks += 1 
-                        done = True 
+            hidden = self.covered & ~self.flag 
+            known_mines = self.flag | (self.mine_count == -1)
+            revealed = ~self.covered & (self.mine_count >= 0)
 
+            hidden_neighbors = neighbor_sum(hidden)
+            remaining = self.mine_count - neighbor_sum(known_mines)
+            open_cells = revealed & (hidden_neighbors > 0)
 
+            # Cells whose hidden neighbors are all mines / all safe 
+            mine_source = open_cells & (remaining == hidden_neighbors)
+            safe_source = open_cells & (self.mine_count == 0)
 
-            self._board.fig.canvas.draw()
+            mine_targets = hidden & (neighbor_sum(mine_source) > 0)
+            safe_targets = hidden & (neighbor_sum(safe_source) > 0) & ~mine_targets
 
-            # delay so that we can watch on the GUI 
-            sleep(delay) 
+            b, i, j = np.nonzero(mine_targets)
+            self._board.flag(b, i, j)
+            self.flag[b, i, j] = True 
 
+            b, i, j = np.nonzero(safe_targets)
+            self.excavate_cells(b, i, j)
 
-        return self._board.score
\ No newline at end of file
+            # Games with no deduction this step reveal a random hidden cell 
+            progress = mine_targets.any(axis=(1, 2)) | safe_targets.any(axis=(1, 2))
+            stuck = np.nonzero(~progress & ~done)[0]
+            if len(stuck): 
+                keys = np.where(hidden[stuck], self.rng.random(hidden[stuck].shape), -1)
+                i, j = np.divmod(keys.reshape(len(stuck), -1).argmax(axis=1), self.dim)
+                self.excavate_cells(stuck, i, j)
+                self.random_clicks[stuck] += 1 
@@ -0,0 +1,238 @@
+import numpy as np
+from seeding import as_generator
+
+
+class BatchBoard():
+    """ This object holds N Minesweeper games of the same size and steps all
+        of them at once.  The state of every game lives in (N, dim, dim)
+        arrays, so actions over many games are single NumPy operations.
+
+        An agent can interface with the games using the following functions:
+            batch.select(batch_idx, i, j)
+                Selects cell (i, j) of game batch_idx.  All three arguments
+                broadcast against each other.  Returns -1 on mine or the
+                minecount of each cell
+            batch.flag(batch_idx, i, j)
+                Toggles flags, same arguments as select()
+            batch.gameover()
+                Returns a bool array marking the games that are over.
+                batch.score is populated for those games
+            batch.score
+                float array of scores.  nan until the game is over
+            batch.reset(batch_idx=None)
+                Starts new games in place of the given ones
+
+    There is no visualization.  The rules and scoring are the same as Board.
+    rng (a seed or np.random.Generator) drives mine placement.
+    """
+
+    # Value returned by select() for cells that were not selected
+    skipped_value = -3
+
+
+
+    def __init__(self, n, dim, num_mines, rng=None):
+        self.n = n
+        self.dim = dim
+
+        # This batch's own random generator
+        self.rng = as_generator(rng)
+
+        # Mine count of each game.  A scalar gives every game the same count
+        self.num_mines = np.broadcast_to(np.asarray(num_mines, dtype=int), (n,)).copy()
+
+        # grids of cells of every game.  Shows mines (-1) and minecounts
+        self.cells = np.zeros((n, dim, dim), dtype=np.int8)
+
+        # grids of bools.  True if agent has excavated the cell
+        self.excavated = np.zeros((n, dim, dim), dtype=bool)
+
+        # grids of bools.  True if agent has placed a flag on the cell
+        self.flags = np.zeros((n, dim, dim), dtype=bool)
+
+
+        # Running counters per game for the gameover check and the score
+        self.excavated_count = np.zeros(n, dtype=int)
+        self.flag_count = np.zeros(n, dtype=int)
+        self.correct_flags = np.zeros(n, dtype=int)
+        self.incorrect_flags = np.zeros(n, dtype=int)
+
+
+        # Bools marking which games are complete
+        self.gameover_mask = np.zeros(n, dtype=bool)
+        # Score values will be populated upon gameover
+        self.score = np.full(n, np.nan)
+
+
+        self.place_mines()
+        self.assign_mine_counts()
+
+
+
+    def reset(self, batch_idx=None):
+        """ Starts new games in place of games batch_idx (every game by
+            default).  Their grids, counters and scores are cleared in place
+            and new mines are placed.  The other games are left alone
+        """
+        b = slice(None) if batch_idx is None else np.asarray(batch_idx, dtype=int)
+
+        self.cells[b] = 0
+        self.excavated[b] = False
+        self.flags[b] = False
+
+        for counter in (self.excavated_count, self.flag_count, self.correct_flags,
+                        self.incorrect_flags):
+            counter[b] = 0
+
+        self.gameover_mask[b] = False
+        self.score[b] = np.nan
+
+        self.place_mines(batch_idx)
+        self.assign_mine_counts(batch_idx)
+
+
+
+    def place_mines(self, batch_idx=None):
+        """ Randomly places self.num_mines[k] mines across the grid of game k,
+            for the games in batch_idx (every game by default).
+            Mines are denoted by (-1)
+
+            Each cell draws a random key.  The num_mines smallest keys of a
+            game become its mines, which samples without replacement.  A
+            partial sort finds each game's threshold key in linear time
+        """
+        b = slice(None) if batch_idx is None else np.asarray(batch_idx, dtype=int)
+        num_mines = self.num_mines[b]
+        keys = self.rng.random((len(num_mines), self.dim**2))
+
+        # After partitioning on every distinct count, position num_mines-1 of
+        #  each row holds that game's num_mines-th smallest key
+        placed = num_mines > 0
+        kth = np.unique(num_mines[placed] - 1)
+        threshold = np.full(len(num_mines), -1.0)
+        if len(kth):
+            partitioned = np.partition(keys, kth, axis=1)
+            threshold[placed] = partitioned[placed, num_mines[placed] - 1]
+
+        mines = keys <= threshold[:, None]
+
+        cells = self.cells.reshape(self.n, -1)
+        cells[b] = np.where(mines, -1, cells[b])
+        return
+
+
+
+    def assign_mine_counts(self, batch_idx=None):
+        """ Assigns adjacentcy mine counts to all non-mine cells of the games
+            in batch_idx (every game by default).  Mine counts can be [0, 8]
+        """
+        b = slice(None) if batch_idx is None else np.asarray(batch_idx, dtype=int)
+        mines = (self.cells[b] == -1)
+        counts = neighbor_sum(mines)
+        self.cells[b] = np.where(mines, -1, counts)
+        return
+
+
+
+    def select(self, batch_idx, i, j):
+        """ Selects cell (i, j) of game batch_idx for every entry of the
+            broadcast arguments.
+
+                If the cell has already been excavated: do nothing
+                If the cell has a flag on it: do nothing
+                If the cell has a mine: reveal the mine
+                Otherwise: reveal the cell's mine count
+
+            Returns an int array holding -1 on mine or the mine count of the
+             cell.  Skipped cells (excavated, flagged or repeated) hold
+             self.skipped_value
+        """
+
+        batch_idx, i, j = [np.ravel(a) for a in np.broadcast_arrays(batch_idx, i, j)]
+        values = np.full(len(i), self.skipped_value, dtype=int)
+
+        # Only the first occurrence of a cell can excavate it
+        flat = (batch_idx * self.dim + i) * self.dim + j
+        _, first = np.unique(flat, return_index=True)
+        selected = np.zeros(len(i), dtype=bool)
+        selected[first] = True
+
+        # Excavated and flagged cells are skipped
+        selected &= ~self.excavated[batch_idx, i, j] & ~self.flags[batch_idx, i, j]
+        b, i, j = batch_idx[selected], i[selected], j[selected]
+
+        self.excavated[b, i, j] = True
+        np.add.at(self.excavated_count, b, 1)
+        values[selected] = self.cells[b, i, j]
+
+        return values
+
+
+
+    def flag(self, batch_idx, i, j):
+        """ Toggles the flag on cell (i, j) of game batch_idx for every entry
+            of the broadcast arguments.  Excavated cells are left alone.
+            A cell listed twice is toggled twice
+        """
+
+        batch_idx, i, j = [np.ravel(a) for a in np.broadcast_arrays(batch_idx, i, j)]
+
+        # Only cells toggled an odd number of times change
+        flat = (batch_idx * self.dim + i) * self.dim + j
+        flat, times = np.unique(flat, return_counts=True)
+        flat = flat[times % 2 == 1]
+        b, rest = np.divmod(flat, self.dim**2)
+        i, j = np.divmod(rest, self.dim)
+
+        keep = ~self.excavated[b, i, j]
+        b, i, j = b[keep], i[keep], j[keep]
+
+        self.flags[b, i, j] = ~self.flags[b, i, j]
+
+        # Keep the flag counters in step.  change is +1 on place, -1 on removal
+        change = np.where(self.flags[b, i, j], 1, -1)
+        mine = (self.cells[b, i, j] == -1)
+        np.add.at(self.flag_count, b, change)
+        np.add.at(self.correct_flags, b[mine], change[mine])
+        np.add.at(self.incorrect_flags, b[~mine], change[~mine])
+
+
+
+    def gameover(self):
+        """ Checks if end-game conditions are met for every game.
+            flag_count + excavated_count == total cells on board
+
+            Returns a bool array.  Scores of newly finished games are filled in
+        """
+
+        done = (self.flag_count + self.excavated_count == self.dim**2)
+        new = done & ~self.gameover_mask
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.score[new] = (self.correct_flags[new] - self.incorrect_flags[new]) / self.num_mines[new]
+
+        self.gameover_mask = done
+        return done
+
+
+
+
+def neighbor_sum(planes):
+    """ Sums every cell's 8 neighbors over the last two axes of planes,
+        treating cells off the grid as 0.  Works on a single (dim, dim) grid
+        or on a stack of them
+    """
+    planes = np.asarray(planes, dtype=np.int8)
+    rows, cols = planes.shape[-2:]
+
+    pad = [(0, 0)] * (planes.ndim - 2) + [(1, 1), (1, 1)]
+    padded = np.pad(planes, pad)
+
+    out = np.zeros(planes.shape, dtype=np.int8)
+    for di in (-1, 0, 1):
+        for dj in (-1, 0, 1):
+            if di == 0 and dj == 0:
+                continue
+            out += padded[..., 1+di:1+di+rows, 1+dj:1+dj+cols]
+
+    return out
@@ -0,0 +1,71 @@
+import numpy as np
+
+
+class BitPlane():
+    """ A (rows, cols) grid of bools packed 8 cells to a byte.
+
+        Indexing follows a 2D bool array for the forms the boards use:
+            plane[i, j]           -> bool (or bool array for index arrays)
+            plane[i, j] = value   -> value may be a bool or a bool array
+        np.asarray(plane) unpacks it into a regular bool array (a copy).
+    """
+
+    def __init__(self, rows, cols):
+        self.shape = (rows, cols)
+
+        # Row-major bits.  Cell (i, j) is bit (7 - j % 8) of byte data[i, j // 8]
+        self.data = np.zeros((rows, (cols + 7) // 8), dtype=np.uint8)
+
+
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+
+
+    def _columns(self, j):
+        """ Normalises negative column indices the way NumPy does and rejects
+            out of range ones.  The padding bits of the last byte must never
+            be read or written
+        """
+        j = np.asarray(j)
+        cols = self.shape[1]
+        if np.any((j < -cols) | (j >= cols)):
+            raise IndexError("column index out of bounds for BitPlane with {} columns".format(cols))
+        return np.where(j < 0, j + cols, j)
+
+
+
+    def __getitem__(self, key):
+        i, j = key
+        j = self._columns(j)
+        return ((self.data[i, j >> 3] >> (7 - (j & 7))) & 1).astype(bool)
+
+
+
+    def __setitem__(self, key, value):
+        i, j = key
+        i, j, value = np.broadcast_arrays(i, self._columns(j), value)
+        byte = j >> 3
+        mask = (1 << (7 - (j & 7))).astype(np.uint8)
+        on = value.astype(bool)
+
+        # ufunc.at so several cells that share a byte all land
+        np.bitwise_or.at(self.data, (i[on], byte[on]), mask[on])
+        np.bitwise_and.at(self.data, (i[~on], byte[~on]), ~mask[~on])
+
+
+
+    def __array__(self, dtype=None, copy=None):
+        out = np.unpackbits(self.data, axis=1, count=self.shape[1]).astype(bool)
+        if dtype is not None:
+            out = out.astype(dtype)
+        return out
+
+
+
+    def clear(self):
+        """ Sets every cell to False
+        """
+        self.data[:] = 0
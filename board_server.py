@@ -0,0 +1,419 @@
+""" Hosts Board and JerkBoard games in a long-lived process on a Unix domain
+    socket, so agents in other processes can play them.
+
+        python board_server.py /tmp/minesweeper.sock
+
+    Agents use RemoteBoard, which has the same interface as Board:
+
+        client = BoardClient('/tmp/minesweeper.sock')
+        board = RemoteBoard(client, dim=30, num_mines=150)
+        CNF_Agent(board).solve()
+
+    Wire format.  Every request is one frame
+
+        <I payload length> <B op> <I game id> <payload>
+
+    and gets exactly one reply frame, in order, so a client can send many
+    requests before reading any reply (pipelining).
+
+        op NEW     payload <H dim> <I num_mines> <d fog probability, < 0 for
+                   a plain Board> <Q seed>.  Reply <I game id>.  The game
+                   is seeded with rng=seed, so it can be played again
+                   locally from RemoteBoard.seed
+        op BATCH   payload: records of <B command> <H i> <H j>, command one
+                   of SELECT, CASCADE, FLAG.  Reply <B gameover> <d score>
+                   then per command <I n> and n (i, j, value) records of
+                   <H i> <H j> <b value>
+        op CLOSE   no payload.  Ends the game.  Empty reply
+
+    Reply frames are <I length> <B status> <body>.  A status of 1 carries a
+    utf-8 error message instead of the body.
+"""
+import os
+import sys
+import math
+import queue
+import socket
+import struct
+import threading
+import socketserver
+import numpy as np
+from time import perf_counter
+from contextlib import contextmanager
+from seeding import as_seed
+
+
+# Frame ops
+NEW, BATCH, CLOSE = 0, 1, 2
+
+# Batch commands
+SELECT, CASCADE, FLAG = 0, 1, 2
+
+_header = struct.Struct('<IBI')
+_reply_header = struct.Struct('<IB')
+_new = struct.Struct('<HIdQ')
+_status = struct.Struct('<Bd')
+_count = struct.Struct('<I')
+
+command_dtype = np.dtype([('command', 'u1'), ('i', '<u2'), ('j', '<u2')])
+reveal_dtype = np.dtype([('i', '<u2'), ('j', '<u2'), ('value', 'i1')])
+
+
+
+
+def _recv_exact(sock, n):
+    """ Reads exactly n bytes from sock.  Returns None if the peer closed
+        the connection before sending anything
+    """
+    data = bytearray()
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            if not data:
+                return None
+            raise ConnectionError("Connection closed mid-frame")
+        data += chunk
+    return bytes(data)
+
+
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    """ Serves the requests of one connection, in order
+    """
+
+    def handle(self):
+        while True:
+            header = _recv_exact(self.request, _header.size)
+            if header is None:
+                return
+
+            length, op, game_id = _header.unpack(header)
+            payload = _recv_exact(self.request, length) if length else b''
+
+            try:
+                body = self.server.dispatch(op, game_id, payload)
+                status = 0
+            except Exception as error:
+                body = str(error).encode('utf-8')
+                status = 1
+
+            self.request.sendall(_reply_header.pack(len(body), status) + body)
+
+
+
+
+class BoardServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """ Unix socket server holding many games, keyed by game id.  Every
+        connection gets a thread.  Games are locked one at a time, so
+        connections playing different games never wait on each other
+    """
+
+    daemon_threads = True
+
+
+
+    def __init__(self, path):
+        # Clear a socket file left over by an earlier server
+        if os.path.exists(path):
+            os.unlink(path)
+
+        socketserver.UnixStreamServer.__init__(self, path, _Handler)
+
+        self._games = dict()
+        self._locks = dict()
+        self._next_id = 0
+        self._games_lock = threading.Lock()
+
+
+
+    def dispatch(self, op, game_id, payload):
+        """ Runs one request.  Returns the reply body
+        """
+        if op == NEW:
+            return self._new_game(*_new.unpack(payload))
+
+        with self._games_lock:
+            if game_id not in self._games:
+                raise ValueError("Unknown game {}".format(game_id))
+            board, lock = self._games[game_id], self._locks[game_id]
+
+            if op == CLOSE:
+                del self._games[game_id]
+                del self._locks[game_id]
+                return b''
+
+        if op != BATCH:
+            raise ValueError("Unknown op {}".format(op))
+
+        with lock:
+            return self._run_batch(board, np.frombuffer(payload, dtype=command_dtype))
+
+
+
+    def _new_game(self, dim, num_mines, fog_probability, seed):
+        # Imported here so the server does not load them before a game exists
+        import board
+        import jerk_board
+
+        if fog_probability < 0:
+            game = board.Board(dim, num_mines, headless=True, rng=seed)
+        else:
+            game = jerk_board.JerkBoard(dim, num_mines, fog_probability, headless=True,
+                                        rng=seed)
+
+        with self._games_lock:
+            game_id = self._next_id
+            self._next_id += 1
+            self._games[game_id] = game
+            self._locks[game_id] = threading.Lock()
+
+        return _count.pack(game_id)
+
+
+
+    def _run_batch(self, board, commands):
+        parts = []
+        for command, i, j in commands.tolist():
+            if command == FLAG:
+                board.user_flag(i, j)
+                revealed = []
+            elif command == CASCADE:
+                revealed = board.user_select(i, j, cascade=True)
+            elif command == SELECT:
+                value = board.user_select(i, j)
+                revealed = [] if value is None else [(i, j, value)]
+            else:
+                raise ValueError("Unknown command {}".format(command))
+
+            parts.append(_count.pack(len(revealed)))
+            parts.append(np.array(revealed, dtype=reveal_dtype).tobytes())
+
+        gameover = board.check_gameover_conditions()
+        score = board.score if board.score is not None else math.nan
+        return _status.pack(gameover, score) + b''.join(parts)
+
+
+
+
+class BoardClient():
+    """ Client for a BoardServer.  Keeps a pool of up to pool_size open
+        connections, which threads sharing the client check out one at a
+        time.  Errors reported by the server are raised as ValueError
+    """
+
+    def __init__(self, path, pool_size=4):
+        self.path = path
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+
+
+    @contextmanager
+    def _connection(self):
+        try:
+            sock = self._pool.get_nowait()
+        except queue.Empty:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.path)
+
+        try:
+            yield sock
+        except BaseException:
+            # The stream may be out of step.  Do not hand it out again
+            sock.close()
+            raise
+
+        try:
+            self._pool.put_nowait(sock)
+        except queue.Full:
+            sock.close()
+
+
+
+    def pipeline(self, requests):
+        """ Sends every (op, game id, payload) request on one connection before
+            reading any reply.  Returns the reply bodies, in order
+        """
+        frames = b''.join(_header.pack(len(payload), op, game_id) + payload
+                          for op, game_id, payload in requests)
+
+        replies = []
+        with self._connection() as sock:
+            sock.sendall(frames)
+            for _ in requests:
+                length, status = _reply_header.unpack(_recv_exact(sock, _reply_header.size))
+                body = _recv_exact(sock, length) if length else b''
+                replies.append((status, body))
+
+        for status, body in replies:
+            if status:
+                raise ValueError(body.decode('utf-8'))
+        return [body for status, body in replies]
+
+
+
+    def new_game(self, dim, num_mines, fog_probability=None, seed=None):
+        """ Starts a game on the server.  A fog_probability makes it a
+            JerkBoard.  seed is an int seed, drawn with seeding.as_seed() if
+            None.  Returns the game id
+        """
+        fog = -1.0 if fog_probability is None else fog_probability
+        seed = as_seed(seed)
+        body, = self.pipeline([(NEW, 0, _new.pack(dim, num_mines, fog, seed))])
+        return _count.unpack(body)[0]
+
+
+
+    def batch(self, game_id, commands):
+        """ Runs a list of (command, i, j) on a game in one round trip.
+            Returns (revealed, gameover, score), where revealed holds a list
+            of (i, j, value) per command
+        """
+        return self.batches([(game_id, commands)])[0]
+
+
+
+    def batches(self, work):
+        """ Pipelined batch().  work is a list of (game id, commands).
+            Returns a list of batch() results
+        """
+        requests = [(BATCH, game_id, np.array(commands, dtype=command_dtype).tobytes())
+                    for game_id, commands in work]
+        return [_parse_batch(body) for body in self.pipeline(requests)]
+
+
+
+    def close_game(self, game_id):
+        self.pipeline([(CLOSE, game_id, b'')])
+
+
+
+    def close(self):
+        """ Closes the pooled connections
+        """
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+
+
+def _parse_batch(body):
+    gameover, score = _status.unpack_from(body)
+    offset = _status.size
+
+    revealed = []
+    while offset < len(body):
+        n, = _count.unpack_from(body, offset)
+        offset += _count.size
+        records = np.frombuffer(body, dtype=reveal_dtype, count=n, offset=offset)
+        offset += n * reveal_dtype.itemsize
+        revealed.append(records.tolist())
+
+    return revealed, bool(gameover), (None if math.isnan(score) else score)
+
+
+
+
+class RemoteBoard():
+    """ Stand-in for Board whose game lives in a BoardServer.  Agents use it
+        like a headless Board.
+
+        Each call is one round trip.  The server reports the gameover state
+        with every reply, so check_gameover_conditions() and score need no
+        round trip of their own.  wait_time adds up the seconds spent waiting
+        on the server, so the agent's own think time is the rest.
+
+        rng works as on Board (see seeding.py).  The server game is seeded
+        with the int seed, so Board(dim, num_mines, rng=board.seed) or the
+        JerkBoard equivalent plays the same game locally
+    """
+
+    # Value returned by user_select_many() for cells that were not selected
+    skipped_value = -3
+
+    # Server games are always played on a bounded grid
+    torus = False
+
+
+
+    def __init__(self, client, dim, num_mines, fog_probability=None, rng=None):
+        self.client = client
+        self.dim = dim
+        self.num_mines = num_mines
+        self.seed = as_seed(rng)
+        self.game_id = client.new_game(dim, num_mines, fog_probability, self.seed)
+
+        self.gameover = False
+        self.score = None
+        self.wait_time = 0.0
+
+        # Never drawn
+        self.headless = True
+        self.fig = None
+
+
+
+    def _batch(self, commands):
+        start = perf_counter()
+        revealed, self.gameover, self.score = self.client.batch(self.game_id, commands)
+        self.wait_time += perf_counter() - start
+        return revealed
+
+
+
+    def user_select(self, i, j, cascade=False):
+        if cascade:
+            return self._batch([(CASCADE, i, j)])[0]
+
+        revealed = self._batch([(SELECT, i, j)])[0]
+        return revealed[0][2] if revealed else None
+
+
+
+    def user_flag(self, i, j):
+        self._batch([(FLAG, i, j)])
+
+
+
+    def user_select_many(self, coords, cascade=False):
+        coords = np.asarray(coords, dtype=int).reshape(-1, 2)
+        command = CASCADE if cascade else SELECT
+        revealed = self._batch([(command, i, j) for i, j in coords])
+
+        if cascade:
+            return [cell for cells in revealed for cell in cells]
+
+        return np.array([cells[0][2] if cells else self.skipped_value
+                         for cells in revealed], dtype=int)
+
+
+
+    def user_flag_many(self, coords):
+        coords = np.asarray(coords, dtype=int).reshape(-1, 2)
+        self._batch([(FLAG, i, j) for i, j in coords])
+
+
+
+    def check_gameover_conditions(self):
+        return self.gameover
+
+
+
+    def close(self):
+        self.client.close_game(self.game_id)
+
+
+
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else '/tmp/minesweeper.sock'
+    server = BoardServer(path)
+    print("Serving boards on {}".format(path))
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.unlink(path)
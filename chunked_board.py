@@ -0,0 +1,305 @@
+import numpy as np
+from collections import deque, OrderedDict
+from bitplane import BitPlane
+from seeding import as_seed
+
+
+class ChunkedBoard():
+    """ A Minesweeper board split into chunk_size x chunk_size chunks that are
+        generated lazily, for boards far too large to hold densely.
+
+        Mines for a chunk come from a random generator seeded with
+        (seed, chunk row, chunk column), so any chunk can be regenerated at
+        any time and always comes out the same.  seed takes what the rng of
+        the other boards takes (see seeding.py) and is kept as the int base
+        seed the chunks use.  A chunk's mine counts are
+        computed from its own mines plus those of its 8 neighbor chunks,
+        which keeps counts across chunk boundaries consistent with the
+        neighbor rule of Board.assign_mine_counts.
+
+        Generated counts are kept in an LRU cache of max_cached_chunks
+        chunks and evicted when it is full.  Excavated and flag state is
+        only stored for chunks the agent has touched, as bit-packed planes.
+
+        Chunks are laid end to end in row-major chunk order, and a chunk
+        covering cells [a, b) of that order gets
+        floor(num_mines * b / dim**2) - floor(num_mines * a / dim**2) mines.
+        That is the density of the board, rounded, and the counts of all
+        chunks add up to exactly num_mines.
+
+        The agent interface is the same as Board:
+            board.user_select(i, j, cascade=False)
+            board.user_flag(i, j)
+            board.user_select_many(coords, cascade=False)
+            board.user_flag_many(coords)
+            board.check_gameover_conditions()
+            board.score
+    There is no visualization; the board is always headless.
+    """
+
+    # Value returned by user_select_many() for cells that were not selected
+    skipped_value = -3
+
+    # Chunks are generated on a bounded grid
+    torus = False
+
+
+
+    def __init__(self, dim, num_mines, chunk_size=64, seed=None, max_cached_chunks=1024):
+        self.dim = dim
+        self.num_mines = num_mines
+        self.chunk_size = chunk_size
+        self.max_cached_chunks = max_cached_chunks
+
+        # Base seed of every chunk's generator
+        self.seed = as_seed(seed)
+
+        # LRU cache of generated chunks.  (ci, cj) -> int8 grid of -1 / counts
+        self._cells = OrderedDict()
+
+        # Per-chunk bit-packed state, only for chunks that were touched
+        self._excavated = dict()
+        self._flags = dict()
+
+
+        # Running counters for the gameover check and the score
+        self.excavated_count = 0
+        self.flag_count = 0
+        self.correct_flags = 0
+        self.incorrect_flags = 0
+
+        # Boolean marking if game is complete
+        self.gameover = False
+        # Score value will be populated to this attribute upon gameover
+        self.score = None
+
+        # No figure is ever built
+        self.headless = True
+        self.fig = None
+
+
+
+    def _chunk_shape(self, ci, cj):
+        """ Returns the (rows, cols) of chunk (ci, cj).  Chunks on the far
+            edges are cut short by the board
+        """
+        c = self.chunk_size
+        return min(c, self.dim - ci * c), min(c, self.dim - cj * c)
+
+
+
+    def _chunk_mine_count(self, ci, cj):
+        """ Returns the number of mines in chunk (ci, cj).  See the class
+            docstring; Python ints keep the products exact on huge boards
+        """
+        c = self.chunk_size
+        rows, cols = self._chunk_shape(ci, cj)
+
+        # Cells in every chunk before this one, in row-major chunk order
+        start = ci * c * self.dim + cj * c * rows
+        end = start + rows * cols
+
+        cells = self.dim**2
+        return self.num_mines * end // cells - self.num_mines * start // cells
+
+
+
+    def _chunk_mines(self, ci, cj):
+        """ Regenerates the bool mine grid of chunk (ci, cj) from its seed
+        """
+        rows, cols = self._chunk_shape(ci, cj)
+        rng = np.random.default_rng([self.seed, ci, cj])
+
+        mines = np.zeros(rows * cols, dtype=bool)
+        mines[rng.choice(rows * cols, self._chunk_mine_count(ci, cj), replace=False)] = True
+        return mines.reshape(rows, cols)
+
+
+
+    def _chunk_cells(self, ci, cj):
+        """ Returns the int8 grid of chunk (ci, cj).  Mines are (-1), every
+            other cell holds its mine count.  Generated on first access
+        """
+        key = (ci, cj)
+        if key in self._cells:
+            self._cells.move_to_end(key)
+            return self._cells[key]
+
+        c = self.chunk_size
+        rows, cols = self._chunk_shape(ci, cj)
+        last = (self.dim - 1) // c
+
+        # Mines of this chunk plus a one cell border taken from its neighbors
+        window = np.zeros((rows + 2, cols + 2), dtype=np.int8)
+        for ni in range(max(ci - 1, 0), min(ci + 2, last + 1)):
+            for nj in range(max(cj - 1, 0), min(cj + 2, last + 1)):
+                mines = self._chunk_mines(ni, nj)
+
+                # Overlap of the neighbor with the window, in board coordinates
+                top, left = max(ni * c, ci * c - 1), max(nj * c, cj * c - 1)
+                bottom = min(ni * c + mines.shape[0], ci * c + rows + 1)
+                right = min(nj * c + mines.shape[1], cj * c + cols + 1)
+                if top >= bottom or left >= right:
+                    continue
+
+                window[top - ci * c + 1:bottom - ci * c + 1,
+                       left - cj * c + 1:right - cj * c + 1] = \
+                    mines[top - ni * c:bottom - ni * c, left - nj * c:right - nj * c]
+
+        counts = np.zeros((rows, cols), dtype=np.int8)
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                if di == 0 and dj == 0:
+                    continue
+                counts += window[1+di:1+di+rows, 1+dj:1+dj+cols]
+
+        cells = np.where(window[1:-1, 1:-1] == 1, -1, counts).astype(np.int8)
+
+        self._cells[key] = cells
+        if len(self._cells) > self.max_cached_chunks:
+            self._cells.popitem(last=False)
+
+        return cells
+
+
+
+    def _locate(self, i, j):
+        """ Splits board coordinates into (chunk key, row, col in chunk)
+        """
+        i, j = int(i), int(j)
+        if not (0 <= i < self.dim and 0 <= j < self.dim):
+            raise IndexError("cell ({}, {}) is off the board".format(i, j))
+
+        ci, r = divmod(i, self.chunk_size)
+        cj, c = divmod(j, self.chunk_size)
+        return (ci, cj), r, c
+
+
+
+    def _get(self, planes, key, r, c):
+        plane = planes.get(key)
+        return plane is not None and bool(plane[r, c])
+
+
+
+    def _set(self, planes, key, r, c, value):
+        if key not in planes:
+            planes[key] = BitPlane(*self._chunk_shape(*key))
+        planes[key][r, c] = value
+
+
+
+    def user_select(self, i, j, cascade=False):
+        """  User function for selecting cell (i, j).  Same rules and return
+             values as Board.user_select()
+        """
+
+        if cascade:
+            return self._cascade([(int(i), int(j))])
+
+        key, r, c = self._locate(i, j)
+
+        # If the cell is excavated or flagged, do nothing
+        if self._get(self._excavated, key, r, c) or self._get(self._flags, key, r, c):
+            return None
+
+        self._set(self._excavated, key, r, c, True)
+        self.excavated_count += 1
+
+        # -1 on mine, mine count otherwise
+        return int(self._chunk_cells(*key)[r, c])
+
+
+
+    def user_flag(self, i, j):
+        """ User function for toggling the flag at cell (i, j)
+        """
+
+        key, r, c = self._locate(i, j)
+
+        # If the cell has already been excavated, do nothing
+        if self._get(self._excavated, key, r, c):
+            return
+
+        flagged = not self._get(self._flags, key, r, c)
+        self._set(self._flags, key, r, c, flagged)
+
+        # Keep the flag counters in step.  change is +1 on place, -1 on removal
+        change = 1 if flagged else -1
+        self.flag_count += change
+        if self._chunk_cells(*key)[r, c] == -1:
+            self.correct_flags += change
+        else:
+            self.incorrect_flags += change
+
+
+
+    def user_select_many(self, coords, cascade=False):
+        """ Batch version of user_select().  Same return values as
+            Board.user_select_many()
+        """
+
+        coords = np.asarray(coords, dtype=int).reshape(-1, 2)
+
+        if cascade:
+            return self._cascade([(int(i), int(j)) for i, j in coords])
+
+        values = np.full(len(coords), self.skipped_value, dtype=int)
+        for k, (i, j) in enumerate(coords):
+            value = self.user_select(i, j)
+            if value is not None:
+                values[k] = value
+
+        return values
+
+
+
+    def user_flag_many(self, coords):
+        """ Batch version of user_flag()
+        """
+        for i, j in np.asarray(coords, dtype=int).reshape(-1, 2):
+            self.user_flag(i, j)
+
+
+
+    def _cascade(self, queue):
+        """ Queue based flood fill for the cascade mode of user_select().
+            Returns a list of (i, j, value) for every cell revealed
+        """
+
+        out = []
+        queue = deque(queue)
+
+        while queue:
+            i, j = queue.popleft()
+
+            value = self.user_select(i, j)
+            if value is None:
+                continue
+            out.append((i, j, value))
+
+            if value == 0:
+                # Neighbors in 8 directions (cardinal plus diagonal)
+                queue.extend((r, c) for r in range(max(i-1, 0), min(i+2, self.dim))
+                             for c in range(max(j-1, 0), min(j+2, self.dim)))
+
+        return out
+
+
+
+    def check_gameover_conditions(self):
+        """ Checks if end-game conditions are met.
+            flag_count + excavated_count == total cells on board
+        """
+
+        if self.dim**2 == (self.flag_count + self.excavated_count):
+            self.gameover = True
+
+            # A board without mines has no meaningful score
+            if self.num_mines:
+                self.score = (self.correct_flags - self.incorrect_flags) / self.num_mines
+            else:
+                self.score = float('nan')
+            return True
+
+        return False
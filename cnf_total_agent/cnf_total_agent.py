@@ -1,51 +1,29 @@
 import numpy as np 
+from seeding import as_generator
+from neighbor_table import neighbor_table
+from agent_state import new_state, CellGrid, UNSAFE, SAFE, MINE 
 from time import sleep 
 from .utils import Variable, Clause, KnowledgeBase 
 
 
-class Cell(): 
-    covered = True 
-    mine = None 
-    mine_count = None 
-    flag = None 
-    safe = None 
-    idx = None 
-
-    def __str__(self):
-        
-        if self.flag: 
-            return "F"
-
-        if self.covered: 
-            return "?"
-
-        if self.mine_count is not None: 
-            return str(self.mine_count)
-        
-        if self.mine: 
-            return 'M' 
-
-        else: 
-            return "err"
-
-    def __repr__(self): 
-        return self.__str__() 
-
-
 class CNF_Total_Agent(): 
 
 
-    def __init__(self, board): 
+    def __init__(self, board, rng=None): 
 
         # Environment/board attribute of agent.  
         self._board = board 
         #   The only allowed interfaces to this object are: 
-        #       .user_select(i, j)
+        #       .user_select(i, j, cascade=False)
         #       .user_flag(i, j)
+        #       .user_select_many(coords, cascade=False)
+        #       .user_flag_many(coords)
+        #       .observation()  (read-only visible, excavated and flag grids)
         #       .check_gameover_conditions()
         #       .score 
         #       .dim 
         #       .num_mines 
+        #       .torus 
         #   Other attribute or functions accesses are illegal and cheating  
         #    e.g The agent cannot access board.cells or board.excavated   
 
@@ -53,26 +31,24 @@ class CNF_Total_Agent():
         # store board metadata locally 
         self.dim = self._board.dim 
         self.num_mines = self._board.num_mines 
+
+        # Neighbors of every cell, shared with the board.  See neighbor_table.py 
+        self.neighbors = neighbor_table(self.dim, self._board.torus)
+
+        # Agent's own random generator for random clicks.  A seed or an 
+        #  np.random.Generator.  See seeding.py 
+        self.rng = as_generator(rng)
         
 
         # attributes used for managing the total mines left constraint 
         self.mines_left = self.num_mines 
-        self.unknown = set()
-
 
-        # Initialize agent's internal knowlege of cells. 
-        #   This is the same as that used in the basic agent 
-        self.cells = np.zeros((self.dim, self.dim), dtype=Cell)
-        counter = 1 
-        for i in range(self.dim): 
-            for j in range(self.dim): 
-                self.cells[i, j] = Cell()
-                self.cells[i, j].idx = counter 
 
-                # set of covered cells for total mines constraint
-                self.unknown.add((i, j, counter))
-
-                counter += 1
+        # Initialize agent's internal knowlege of cells, one array per cell 
+        #  attribute.  This is the same as that used in the basic agent, plus 
+        #  each cell's variable idx in the knowledgebase.  See agent_state.py 
+        self.covered, self.flag, self.safe, self.mine_count, self.idx = new_state(self.dim, idx=True)
+        self.cells = CellGrid(self)
 
 
 
@@ -93,18 +69,52 @@ class CNF_Total_Agent():
         """
 
         # If flagged, cannot excavate 
-        if self.cells[i, j].flag: 
+        if self.flag[i, j]: 
+            return False 
+
+        # Zero cells cascade on the board.  Learn from every revealed cell 
+        for (r, c, value) in self._board.user_select(i, j, cascade=True): 
+            self.update_excavated_cell(r, c, value, log=log)
+
+        return True 
+
+
+
+    def excavate_cells(self, coords, log=False): 
+        """ Agent digs up every cell in coords with a single user_select_many() 
+        call to the board, then updates internal data structs for every cell 
+        revealed, including those opened by the zero cascade.
+
+        Returns true if any cell was excavated 
+        """
+
+        # Flagged cells cannot be excavated 
+        coords = [(i, j) for (i, j) in coords if not self.flag[i, j]]
+        if not coords: 
             return False 
 
-        value = self._board.user_select(i, j) 
-        self.cells[i, j].covered = False 
-        self.unknown.remove((i, j, self.cells[i, j].idx))
+        revealed = self._board.user_select_many(coords, cascade=True)
+        for (r, c, value) in revealed: 
+            self.update_excavated_cell(r, c, value, log=log)
+
+        return True 
+
+
+
+    def update_excavated_cell(self, i, j, value, log=False): 
+        """ Updates internal data structs with the value returned by the board 
+        for excavating (i, j).
+
+        Returns true 
+        """
+
+        self.covered[i, j] = False 
 
 
         # Hit a mine 
         if value == -1: 
-            self.cells[i, j].mine = True 
-            self.cells[i, j].safe = False 
+            self.mine_count[i, j] = value 
+            self.safe[i, j] = UNSAFE 
             self.mines_left -= 1
             if log: print("Excavated a mine at ({}, {})".format(i, j))
 
@@ -112,13 +122,13 @@ class CNF_Total_Agent():
             # Update the knowledgebase.
             #  Discovered that Cell(i, j) is a mine. 
             #  Create a literal that represents this knowledge and add it to KB 
-            idx = self.cells[i, j].idx 
+            idx = self.idx.item(i, j) 
             literal = Variable(i=i, j=j, idx=idx, mine=True)
             self.kb.add_literal(literal)
             if log: print("Added {} to knowledgebase.".format(literal))
 
             # # Add new total mines remaining constraint to KB
-            # self.kb.add_total_mines_constraint(self.mines_left, list(self.unknown))
+            # self.kb.add_total_mines_constraint(self.mines_left, self.get_unknown_cells_idx())
             # if log: print("Added total mines clauses to knowledgebase. {}/{}".format(self.mines_left, self.num_mines))
 
 
@@ -128,8 +138,8 @@ class CNF_Total_Agent():
         # Did not hit a mine.  GOt a mine_count (stored in value) 
 
 
-            self.cells[i, j].mine_count = value 
-            self.cells[i, j].safe = True 
+            self.mine_count[i, j] = value 
+            self.safe[i, j] = SAFE 
             if log: print("Excavated ({}, {})".format(i, j))
 
 
@@ -141,7 +151,7 @@ class CNF_Total_Agent():
             #  (1) 
             #  Discovered that Cell(i, j) is not a mine. 
             #  Create a literal that represents this knowledge and add it to KB 
-            idx = self.cells[i, j].idx 
+            idx = self.idx.item(i, j) 
             literal = Variable(i=i, j=j, idx=idx, mine=False)
             self.kb.add_literal(literal)
             if log: print("Added {} to knowledgebase.".format(literal))
@@ -177,29 +187,47 @@ class CNF_Total_Agent():
 
         # Send toggle_flag command to board 
         self._board.user_flag(i, j)
+        self.update_flagged_cell(i, j, log=log)
+
+
+
+    def toggle_flags(self, coords, log=False): 
+        """ Toggles flags on every cell in coords with a single user_flag_many() 
+        call to the board, then updates internal structures cell by cell.
+        """
+
+        self._board.user_flag_many(coords)
+        for (i, j) in coords: 
+            self.update_flagged_cell(i, j, log=log)
+
+
+
+    def update_flagged_cell(self, i, j, log=False): 
+        """ Updates internal structures after the flag on (i, j) was toggled 
+        """
+
         if log: print("Toggled flag at ({}, {})".format(i, j))
 
         # Flag was already present
-        if self.cells[i, j].flag: 
-            self.cells[i, j].flag = False 
+        if self.flag[i, j]: 
+            self.flag[i, j] = False 
             # update knowledge base? This situation should never happen.
 
         # Flag wasnt present 
         else: 
-            self.cells[i, j].flag = True 
+            self.flag[i, j] = True 
             self.mines_left -= 1
-            self.unknown.remove((i, j, self.cells[i, j].idx))
-
+    
             # Update knowledgebase.
             #   Identified a mine at (i, j)
             #   Create a literal that represents this knowledge and add it to KB 
-            idx = self.cells[i, j].idx 
+            idx = self.idx.item(i, j) 
             literal = Variable(i=i, j=j, idx=idx, mine=True)
             self.kb.add_literal(literal)
             if log: print("Added {} to knowledgebase.".format(literal))
 
             # Add new total mines remaining constraint to KB
-            # self.kb.add_total_mines_constraint(self.mines_left, list(self.unknown))
+            # self.kb.add_total_mines_constraint(self.mines_left, self.get_unknown_cells_idx())
             # if log: print("Added total mines clauses to knowledgebase. {}/{}".format(self.mines_left, self.num_mines))
 
 
@@ -224,10 +252,10 @@ class CNF_Total_Agent():
                 # Already know about this unit clause, go to next iteration 
                 #   If the cell is uncovered 
                 #   If the cell has a flag 
-                if (not self.cells[i, j].covered): 
+                if (not self.covered[i, j]): 
                     continue 
 
-                if self.cells[i, j].flag:
+                if self.flag[i, j]:
                     continue 
 
                 # Learning about an covered, unflagged cell 
@@ -236,12 +264,12 @@ class CNF_Total_Agent():
                 # It is a mine 
                 if literal.mine: 
 
-                    self.cells[i, j].safe = False 
+                    self.safe[i, j] = UNSAFE 
                     if log: print("Learned ({}, {}) is a mine via unit clause.".format(i, j))
 
                 # It is safe 
                 else:
-                    self.cells[i, j].safe = True 
+                    self.safe[i, j] = SAFE 
                     if log: print("Learned ({}, {}) is safe via unit clause.".format(i, j))
 
         return success
@@ -249,43 +277,31 @@ class CNF_Total_Agent():
 
 
     def uncover_all_safe_cells(self, log=False):
-        """ Loop through all cells on the board and excavate any covered 
-           cell marked safe
+        """ Excavate every covered cell marked safe
 
-           Returns True if any of the excavate_cell calls was successful 
+           Returns True if any cell was excavated 
         """
 
-        success = False 
-
-        for i in range(self.dim): 
-            for j in range(self.dim): 
+        coords = np.argwhere(self.covered & (self.safe == SAFE))
 
-                if self.cells[i, j].covered and self.cells[i, j].safe: 
-                    ret = self.excavate_cell(i, j, log) 
-                    if ret: 
-                        success = True 
-
-        return success 
+        # Excavate them all in one batch 
+        return self.excavate_cells(coords.tolist(), log) 
 
 
 
     def mark_all_mine_cells(self, log=False): 
-        """ Loop through all the cells on the board and flag any covered cells 
-            marked as not safe.  
+        """ Flag every covered, unflagged cell marked as not safe.  
 
-            Returns True if any of the toggle_flag calls was successful 
+            Returns True if any flag was placed 
         """
 
-        success = False 
-
-        for i in range(self.dim): 
-            for j in range(self.dim): 
+        coords = np.argwhere(self.covered & (self.safe == UNSAFE) & ~self.flag)
 
-                if self.cells[i, j].covered and (self.cells[i, j].safe == False) and (not self.cells[i, j].flag):
-                    self.toggle_flag(i, j, log)
-                    success = True 
+        # Flag them all in one batch 
+        if len(coords): 
+            self.toggle_flags(coords.tolist(), log)
 
-        return success
+        return len(coords) > 0 
 
 
 
@@ -295,22 +311,27 @@ class CNF_Total_Agent():
         """
 
 
-        neighbors = [(i+1, j+1), (i+1, j), (i, j+1), (i-1, j+1), \
-                (i-1, j-1), (i-1, j), (i, j-1), (i+1, j-1)]
-
         out = []
 
-        for neighbor in neighbors: 
-            # The neighbor is within bounds of the board 
-            if (0 <= neighbor[0] < self.dim) and (0 <= neighbor[1] < self.dim): 
-
-                # The neighbor is covered and not a flag 
-                if self.cells[neighbor].covered and not self.cells[neighbor].flag: 
-                    out.append((neighbor[0], neighbor[1], self.cells[neighbor].idx)) 
+        for neighbor in self.neighbors.of(i, j): 
+            # The neighbor is covered and not a flag 
+            if self.covered[neighbor] and not self.flag[neighbor]: 
+                out.append((neighbor[0], neighbor[1], self.idx.item(neighbor))) 
                 
         return out 
 
 
+    def get_unknown_cells_idx(self): 
+        """ Returns a list of tuples of every covered, unflagged cell on the 
+             board, for the total mines constraint.  
+             Tuples are of the form:  (i, j, idx) 
+        """
+
+        unknown = self.covered & ~self.flag 
+        coords = np.argwhere(unknown).tolist()
+        return [(i, j, idx) for (i, j), idx in zip(coords, self.idx[unknown].tolist())]
+
+
     def get_unknown_mine_count(self, i, j): 
         """ Returns the number of unknown mines surrounding (i, j).
 
@@ -318,26 +339,19 @@ class CNF_Total_Agent():
              excavated mines. 
         """
 
-        value = self.cells[i, j].mine_count
+        value = self.mine_count.item(i, j)
         excavated_mine_count = 0
         flagged_mine_count = 0 
 
-        neighbors = [(i+1, j+1), (i+1, j), (i, j+1), (i-1, j+1), \
-                (i-1, j-1), (i-1, j), (i, j-1), (i+1, j-1)]
-
-
-        for neighbor in neighbors: 
-            # The neighbor is within bounds of the board 
-            if (0 <= neighbor[0] < self.dim) and (0 <= neighbor[1] < self.dim): 
-
-                # The neighbor is an excavated mine
-                if self.cells[neighbor].mine == True and self.cells[neighbor].safe == False: 
-                    excavated_mine_count += 1 
+        for neighbor in self.neighbors.of(i, j): 
+            # The neighbor is an excavated mine
+            if self.mine_count[neighbor] == MINE: 
+                excavated_mine_count += 1 
 
 
-                # The neighbor is a flagged mine 
-                if self.cells[neighbor].flag == True:  
-                    flagged_mine_count += 1
+            # The neighbor is a flagged mine 
+            if self.flag[neighbor]:  
+                flagged_mine_count += 1
 
 
         return value - excavated_mine_count - flagged_mine_count
@@ -353,22 +367,18 @@ class CNF_Total_Agent():
 
         success = False 
 
-        # Iterate through all cells 
-        for i in range(self.dim): 
-            for j in range(self.dim): 
+        # Iterate through all unknown (covered, unflagged) cells 
+        for (i, j) in np.argwhere(self.covered & ~self.flag).tolist(): 
 
-                # If unknown cells 
-                if self.cells[i, j].covered and not self.cells[i, j].flag: 
+            # Create literal and run query against KB 
+            literal = Variable(i, j, self.idx.item(i, j), False)
+            response = self.kb.query(literal)
 
-                    # Create literal and run query against KB 
-                    literal = Variable(i, j, self.cells[i, j].idx, False)
-                    response = self.kb.query(literal)
-
-                    if response == 'UNSAT':
-                        # It is unsat. Thus, (i, j) is a mine 
-                        self.cells[i, j].safe = False 
-                        success = True 
-                        if log: print("Learned ({}, {}) is a mine via negative query.".format(i, j))
+            if response == 'UNSAT':
+                # It is unsat. Thus, (i, j) is a mine 
+                self.safe[i, j] = UNSAFE 
+                success = True 
+                if log: print("Learned ({}, {}) is a mine via negative query.".format(i, j))
 
 
         return success 
@@ -383,22 +393,18 @@ class CNF_Total_Agent():
 
         success = False 
 
-        # Iterate through all cells 
-        for i in range(self.dim): 
-            for j in range(self.dim): 
+        # Iterate through all unknown (covered, unflagged) cells 
+        for (i, j) in np.argwhere(self.covered & ~self.flag).tolist(): 
 
-                # If unknown cells 
-                if self.cells[i, j].covered and not self.cells[i, j].flag: 
+            # Create literal and run query against KB 
+            literal = Variable(i, j, self.idx.item(i, j), True)
+            response = self.kb.query(literal)
 
-                    # Create literal and run query against KB 
-                    literal = Variable(i, j, self.cells[i, j].idx, True)
-                    response = self.kb.query(literal)
-
-                    if response == 'UNSAT':
-                        # It is unsat. Thus, (i, j) is safe  
-                        self.cells[i, j].safe = True  
-                        success = True 
-                        if log: print("Learned ({}, {}) is safe via positive query.".format(i, j))
+            if response == 'UNSAT':
+                # It is unsat. Thus, (i, j) is safe  
+                self.safe[i, j] = SAFE  
+                success = True 
+                if log: print("Learned ({}, {}) is safe via positive query.".format(i, j))
 
 
         return success 
@@ -413,51 +419,43 @@ class CNF_Total_Agent():
 
         # Add new total mines remaining constraint to KB
         if log: print("Attempting to add total mines to knowledgebase. {}/{}".format(self.mines_left, self.num_mines))
-        check = self.kb.generate_total_mines_constraint(self.mines_left, list(self.unknown))
+        check = self.kb.generate_total_mines_constraint(self.mines_left, self.get_unknown_cells_idx())
         if log: print("Added total mines clauses to knowledgebase. {}/{}".format(self.mines_left, self.num_mines))
 
 
         # query postiive 
         positive = False 
 
-        # Iterate through all cells 
-        for i in range(self.dim): 
-            for j in range(self.dim): 
+        # Iterate through all unknown (covered, unflagged) cells 
+        for (i, j) in np.argwhere(self.covered & ~self.flag).tolist(): 
 
-                # If unknown cells 
-                if self.cells[i, j].covered and not self.cells[i, j].flag: 
+            # Create literal and run query against KB 
+            literal = Variable(i, j, self.idx.item(i, j), True)
+            response = self.kb.query_with_global(literal)
 
-                    # Create literal and run query against KB 
-                    literal = Variable(i, j, self.cells[i, j].idx, True)
-                    response = self.kb.query_with_global(literal)
-
-                    if response == 'UNSAT':
-                        # It is unsat. Thus, (i, j) is safe  
-                        self.cells[i, j].safe = True  
-                        positive = True 
-                        if log: print("**Learned ({}, {}) is safe via positive query on totalmines.".format(i, j))
+            if response == 'UNSAT':
+                # It is unsat. Thus, (i, j) is safe  
+                self.safe[i, j] = SAFE  
+                positive = True 
+                if log: print("**Learned ({}, {}) is safe via positive query on totalmines.".format(i, j))
 
 
 
         # query negative 
         negative = False 
 
-        # Iterate through all cells 
-        for i in range(self.dim): 
-            for j in range(self.dim): 
-
-                # If unknown cells 
-                if self.cells[i, j].covered and not self.cells[i, j].flag: 
+        # Iterate through all unknown (covered, unflagged) cells 
+        for (i, j) in np.argwhere(self.covered & ~self.flag).tolist(): 
 
-                    # Create literal and run query against KB 
-                    literal = Variable(i, j, self.cells[i, j].idx, False)
-                    response = self.kb.query_with_global(literal)
+            # Create literal and run query against KB 
+            literal = Variable(i, j, self.idx.item(i, j), False)
+            response = self.kb.query_with_global(literal)
 
-                    if response == 'UNSAT':
-                        # It is unsat. Thus, (i, j) is a mine 
-                        self.cells[i, j].safe = False 
-                        negative = True 
-                        if log: print("**Learned ({}, {}) is a mine via negative query on totalmines.".format(i, j))
+            if response == 'UNSAT':
+                # It is unsat. Thus, (i, j) is a mine 
+                self.safe[i, j] = UNSAFE 
+                negative = True 
+                if log: print("**Learned ({}, {}) is a mine via negative query on totalmines.".format(i, j))
 
 
         if positive or negative: 
@@ -469,7 +467,7 @@ class CNF_Total_Agent():
 
 
 
-    def solve(self, interactive=False, log=False, delay=0, total_mines_clause=False): 
+    def solve(self, interactive=False, log=False, delay=0, total_mines_clause=False, recorder=None): 
 
         self.excavate_cell(0, 0, log=log)
 
@@ -479,15 +477,19 @@ class CNF_Total_Agent():
                 input("Press Enter to continue...")
 
 
+            # Queue this step's changes for the recorder (see recorder.py) 
+            if recorder is not None: 
+                recorder.capture()
+
             # Check endgame conditions.  Return score if end 
             if (self._board.check_gameover_conditions()):
                 return self._board.score
 
-            # Draw the canvas on this iteration 
-            self._board.fig.canvas.draw()
-
-            # delay so that we can watch on the GUI 
-            sleep(delay) 
+            # Draw the canvas on this iteration and delay so that we can watch 
+            #  on the GUI.  Skipped when the board has no figure (headless or closed) 
+            if self._board.fig is not None: 
+                self._board.draw()
+                sleep(delay) 
 
 
             # (1) Check for unit clauses in the KB
@@ -530,14 +532,10 @@ class CNF_Total_Agent():
 
 
             # (4) Uncover random unknown cell 
-            done = False 
-            while (not done): 
-                i, j = np.random.randint(0, self.dim, size=2)
-                if self.cells[i, j].covered and not self.cells[i, j].flag: 
-                    if log: print("\tRandomly selected ({}, {}) to uncover.".format(i, j))
-                    self.excavate_cell(i, j, log=log) 
-                    self.random_clicks += 1
-                    done = True 
+            i, j = divmod(int(self.rng.choice(np.flatnonzero(self.covered & ~self.flag))), self.dim)
+            if log: print("\tRandomly selected ({}, {}) to uncover.".format(i, j))
+            self.excavate_cell(i, j, log=log) 
+            self.random_clicks += 1
 
 
 
@@ -549,7 +547,8 @@ class CNF_Total_Agent():
             return self._board.score
 
         # Draw the canvas on this iteration 
-        self._board.fig.canvas.draw()
+        if self._board.fig is not None: 
+            self._board.draw()
 
 
 
@@ -562,7 +561,8 @@ class CNF_Total_Agent():
             self.uncover_all_safe_cells(log=log)
             self.mark_all_mine_cells(log=log)
 
-            self._board.fig.canvas.draw()
+            if self._board.fig is not None: 
+                self._board.draw()
             return  
 
         # (2) Query for -M(i, j)  
@@ -571,7 +571,8 @@ class CNF_Total_Agent():
 
         if negative_query_check: 
             self.mark_all_mine_cells(log=log)
-            self._board.fig.canvas.draw()
+            if self._board.fig is not None: 
+                self._board.draw()
             return  
 
 
@@ -581,7 +582,8 @@ class CNF_Total_Agent():
 
         if positive_query_check:
             self.uncover_all_safe_cells(log=log)
-            self._board.fig.canvas.draw()
+            if self._board.fig is not None: 
+                self._board.draw()
             return  
 
 
@@ -593,21 +595,19 @@ class CNF_Total_Agent():
         if total_mines_query: 
             self.uncover_all_safe_cells(log=log)
             self.mark_all_mine_cells(log=log)
-            self._board.fig.canvas.draw()
+            if self._board.fig is not None: 
+                self._board.draw()
             return  
 
 
         # (4) Uncover random unknown cell 
-        done = False 
-        while (not done): 
-            i, j = np.random.randint(0, self.dim, size=2)
-            if self.cells[i, j].covered and not self.cells[i, j].flag: 
-                if log: print("\tRandomly selected ({}, {}) to uncover.".format(i, j))
-                self.excavate_cell(i, j, log=log) 
-                done = True      
+        i, j = divmod(int(self.rng.choice(np.flatnonzero(self.covered & ~self.flag))), self.dim)
+        if log: print("\tRandomly selected ({}, {}) to uncover.".format(i, j))
+        self.excavate_cell(i, j, log=log) 
 
 
-        self._board.fig.canvas.draw()
+        if self._board.fig is not None: 
+            self._board.draw()
         return  
 
 
@@ -623,32 +623,30 @@ class CNF_Total_Agent():
         """
 
 
-        for i in range(self.dim): 
-            for j in range(self.dim): 
-                # If unknown cells 
-                if self.cells[i, j].covered and not self.cells[i, j].flag: 
+        # Iterate through all unknown (covered, unflagged) cells 
+        for (i, j) in np.argwhere(self.covered & ~self.flag).tolist(): 
                     
-                    true_sat = False
-                    false_sat = False
+            true_sat = False
+            false_sat = False
 
-                    # M(i, j) Create literal and run query against KB 
-                    literal = Variable(i, j, self.cells[i, j].idx, True)
-                    response = self.kb.query(literal)
+            # M(i, j) Create literal and run query against KB 
+            literal = Variable(i, j, self.idx.item(i, j), True)
+            response = self.kb.query(literal)
 
-                    if response == 'UNSAT':
-                        true_sat = True 
+            if response == 'UNSAT':
+                true_sat = True 
 
                         
-                    # -M(i, j) Create literal and run query against KB 
-                    literal = Variable(i, j, self.cells[i, j].idx, False)
-                    response = self.kb.query(literal)
+            # -M(i, j) Create literal and run query against KB 
+            literal = Variable(i, j, self.idx.item(i, j), False)
+            response = self.kb.query(literal)
 
-                    if response == 'UNSAT':
-                        false_sat = True 
+            if response == 'UNSAT':
+                false_sat = True 
                         
                     
-                    if true_sat and false_sat: 
-                        print("KB flawed for query using ({}, {})".format(i, j))
-                        return False 
+            if true_sat and false_sat: 
+                print("KB flawed for query using ({}, {})".format(i, j))
+                return False 
 
         return True 
\ No newline at end of file
@@ -0,0 +1,135 @@
+""" Pre-generated board layouts in one memory-mapped .npy file.
+
+    The file holds a 1-d array of records, one per layout:
+        num_mines   <u4
+        mines       (dim, ceil(dim / 8)) uint8, the mine plane bit-packed
+                    along each row as np.packbits() does
+    so record k is found by its index alone.  load_corpus() maps the file
+    read-only, which lets many worker processes share one copy through the
+    page cache.  Board.from_corpus(path, k) plays layout k.
+
+    Generating from the command line:
+        python corpus.py boards.npy --dim 16 --mines 40 -n 1000000 --seed 0
+"""
+import numpy as np
+from functools import lru_cache
+from numpy.lib.format import open_memmap
+import seeding
+
+
+# Cells generated per block, about 32 MB of random keys.  Each block has its
+#  own spawned seed, so the file does not depend on how the blocks were
+#  spread over processes
+block_cells = 2**22
+
+
+
+
+def corpus_dtype(dim):
+    """ Returns the record dtype of a corpus of (dim, dim) boards
+    """
+    return np.dtype([('num_mines', '<u4'), ('mines', 'u1', (dim, (dim + 7) // 8))])
+
+
+
+def generate_corpus(path, dim, num_mines, n, seed=None, processes=None):
+    """ Writes n random layouts of num_mines mines on a (dim, dim) board to
+        path.  The same seed always gives the same file.  processes=N fills
+        the blocks on a pool of N worker processes
+    """
+    if not 0 <= num_mines <= dim**2:
+        raise ValueError("Cannot place {} mines on a {}x{} board".format(num_mines, dim, dim))
+
+    fill_blocks(_fill_block, path, dim, num_mines, n, max(1, block_cells // dim**2),
+                seed=seed, processes=processes)
+
+
+
+def fill_blocks(fill, path, dim, num_mines, n, size, seed=None, processes=None):
+    """ Creates the corpus file and has fill(block) generate its records in
+        blocks of size.  block is (path, dim, num_mines, start, stop, seed)
+        for records [start, stop).  Each block gets its own spawned seed.
+        Shared by generate_corpus() and no_guess.generate_corpus()
+    """
+    corpus = open_memmap(path, mode='w+', dtype=corpus_dtype(dim), shape=(n,))
+    del corpus
+
+    starts = range(0, n, size)
+    blocks = [(path, dim, num_mines, start, min(start + size, n), block_seed)
+              for start, block_seed in zip(starts, seeding.spawn(seed, len(starts)))]
+
+    if processes:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(processes) as pool:
+            list(pool.map(fill, blocks))
+    else:
+        for block in blocks:
+            fill(block)
+
+
+
+def _fill_block(block):
+    """ Generates and writes records [start, stop) of a corpus
+    """
+    path, dim, num_mines, start, stop, seed = block
+    rng = np.random.default_rng(seed)
+    count = stop - start
+
+    # Every cell draws a key.  The num_mines smallest of each board are mines,
+    #  found with a partition as in BatchBoard.place_mines()
+    keys = rng.random((count, dim**2))
+    if num_mines:
+        threshold = np.partition(keys, num_mines - 1, axis=1)[:, num_mines - 1]
+        mines = keys <= threshold[:, None]
+    else:
+        mines = np.zeros(keys.shape, dtype=bool)
+
+    write_block(path, start, mines.reshape(count, dim, dim))
+
+
+
+def write_block(path, start, mines):
+    """ Packs a (count, dim, dim) bool stack of layouts into records
+        [start, start + count) of the corpus at path
+    """
+    corpus = np.load(path, mmap_mode='r+')
+    stop = start + len(mines)
+    corpus['num_mines'][start:stop] = mines.sum(axis=(1, 2))
+    corpus['mines'][start:stop] = np.packbits(mines, axis=-1)
+    corpus.flush()
+
+
+
+@lru_cache(maxsize=16)
+def load_corpus(path):
+    """ Returns the corpus at path as a read-only memory map.  Cached, so
+        repeated lookups do not reopen the file
+    """
+    return np.load(path, mmap_mode='r')
+
+
+
+def layout(path, k):
+    """ Returns the (dim, dim) bool mine grid of layout k
+    """
+    record = load_corpus(path)[k]
+    dim = record['mines'].shape[0]
+    return np.unpackbits(record['mines'], axis=-1, count=dim).astype(bool)
+
+
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a corpus of board layouts")
+    parser.add_argument('path')
+    parser.add_argument('--dim', type=int, required=True)
+    parser.add_argument('--mines', type=int, required=True)
+    parser.add_argument('-n', type=int, required=True)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args()
+
+    generate_corpus(args.path, args.dim, args.mines, args.n, seed=args.seed,
+                    processes=args.processes)
@@ -0,0 +1,52 @@
+""" Change events emitted by Board and JerkBoard.
+
+        Event('reveal', i, j, value)     cell excavated.  value is -1 on mine
+                                         or the mine count
+        Event('fog', i, j, -2)           cell excavated, hint hidden by fog
+        Event('flag', i, j, True/False)  flag placed (True) or removed (False)
+        Event('hide', i, j, None)        excavation undone by restore()
+        Event('gameover', None, None, score)
+        Event('reset', None, None, None) board.reset() started a new game
+"""
+from collections import deque, namedtuple
+
+
+Event = namedtuple('Event', ['kind', 'i', 'j', 'value'])
+
+
+
+
+class EventStream():
+    """ Buffers the events of a board from the moment it is created.
+
+        Iterating over the stream yields the buffered events in order and
+        stops when the buffer is empty.  It can be iterated again later to
+        pick up what happened since.  close() stops the buffering
+    """
+
+    def __init__(self, board):
+        self._buffer = deque()
+        self._unsubscribe = board.subscribe(self._buffer.append)
+
+
+
+    def __iter__(self):
+        return self
+
+
+
+    def __next__(self):
+        if not self._buffer:
+            raise StopIteration
+        return self._buffer.popleft()
+
+
+
+    def __len__(self):
+        return len(self._buffer)
+
+
+
+    def close(self):
+        self._unsubscribe()
+        self._buffer.clear()
@@ -1,6 +1,12 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.patches import RegularPolygon
+from time import perf_counter
+from collections import deque
+from bitplane import BitPlane
+from events import Event, EventStream
+from seeding import as_generator
+from neighbor_table import neighbor_table
+from journal import UndoJournal
+import corpus
 
 
 class JerkBoard(): 
@@ -10,11 +16,40 @@ class JerkBoard():
                 Right click a cell.  Returns -1 if mine or minecount of cell 
             board.user_flag(i, j)
                 Toggles mine on a cell 
+            board.user_select_many(coords) / board.user_flag_many(coords)
+                Batch versions of the above for an (n, 2) array of cells 
             board.check_gameover_conditions()
                 Returns boolean to check if game is over.  If true, board.score 
                 is populated 
             board.score 
                 Get score of the game following gameover conditions are met 
+            board.snapshot() / board.restore(token)
+                Capture the state of the game and roll back to it later 
+            board.reset(num_mines=None, fog_probability=None, seed=None)
+                Start a new game on the same board, reusing its grids 
+            board.observation()
+                Read-only (visible, excavated, flags) arrays of what the 
+                agent is allowed to see.  See observation() 
+            board.subscribe(callback) / board.events()
+                Be told about every change (reveal, fog, flag, gameover) as 
+                it happens instead of rescanning the board.  See events.py 
+
+    Pass headless=True to skip building the matplotlib figure.  It is created
+    lazily the first time board.render() is called.  board.close() releases it.
+    matplotlib itself is not imported until then, so headless boards load fast.
+    Actions only mark cells dirty.  board.draw() pushes the dirty cells to the
+    screen, blitting them over a cached background at most max_fps times a
+    second, so agents can call it every step without waiting on the canvas.
+    Pass renderer='raster' to draw the board as a single image instead of one
+    patch per cell, which keeps large boards fast to draw.  See raster.py 
+    Pass compact=True to store the game state in int8 and bit-packed grids.
+    mines (a (dim, dim) bool grid) sets the layout instead of placing mines 
+    at random.  JerkBoard.from_corpus(path, k) plays layout k of a corpus file.  
+    rng (a seed or np.random.Generator) drives mine placement and the fog.  See 
+    seeding.py.  The fog is rolled for every cell up front, together with the 
+    mines (see sample_fog()), so a game replayed from the same seed at a 
+    higher fog_probability fogs every cell the lower one did, and more. 
+    Pass torus=True to wrap the grid around both axes.  See neighbor_table.py 
 
     The following blog post was used as reference for the visualization commponent 
     of this object.      
@@ -27,26 +62,90 @@ class JerkBoard():
     flag_vertices = np.array([[0.25, 0.2], [0.25, 0.8],
                               [0.75, 0.65], [0.25, 0.5]])
 
+    # Value returned by user_select_many() for cells that were not selected 
+    skipped_value = -3 
+
+    # Value of covered cells in the visible grid of observation() 
+    hidden_value = -4 
+
 
 
     
-    def __init__(self, dim=15, num_mines=45, fog_probability=0.2):
+    def __init__(self, dim=15, num_mines=45, fog_probability=0.2, headless=False, 
+                 compact=False, max_fps=30, renderer='patches', 
+                 rng=None, mines=None, torus=False):
         self.dim = dim
         self.num_mines = num_mines 
+
+        # torus=True wraps the grid around both axes, so every cell has 8 
+        #  neighbors.  The neighbor table is shared with every other board and 
+        #  agent of the same size.  See neighbor_table.py 
+        self.torus = torus 
+        self._neighbors = neighbor_table(dim, torus)
+
+        # This board's own random generator 
+        self.rng = as_generator(rng)
         
         # fog probability is the chance that the board will not return the hint 
         #  to the agent.  It will instead return a integer value of -2, signifying that 
         #  a hint was not provided.  
         self.fog_probability = fog_probability
 
+        # Compact boards store int8 cells and bit-packed bool grids, for very 
+        #  large boards.  See nbytes for the memory used 
+        self.compact = compact 
+        if compact: 
+            new_grid = lambda: BitPlane(dim, dim)
+        else: 
+            new_grid = lambda: np.zeros((dim, dim), dtype=bool)
+
         # grid of cells of the board.  Shows mines (-1) and minecounts  
-        self.cells = np.zeros((dim, dim))
+        self.cells = np.zeros((dim, dim), dtype=np.int8 if compact else float)
         
         # grid of bools.  True if agent has excavated the cell at i, j 
-        self.excavated = np.zeros((dim, dim), dtype=bool) 
+        self.excavated = new_grid()
         
         # grid of bools.  True if agent has placed a flag at i, j
-        self.flags = np.zeros((dim, dim), dtype=object)
+        self.flags = new_grid()
+
+        # grid of what the agent has been shown.  The value returned when a 
+        #  cell was excavated, hidden_value while it is covered 
+        self._visible = np.full((dim, dim), self.hidden_value, dtype=np.int8)
+
+        # grid of bools.  True if the hint for an excavated cell at i, j was 
+        #  clouded by fog 
+        self.fogged = new_grid()
+
+        # grid of uniform [0, 1) rolls, one per cell.  The hint of a cell is 
+        #  fogged if its roll is <= fog_probability.  See sample_fog().  Kept 
+        #  as float64 on compact boards too, so both modes fog the same cells 
+        #  for a seed at any fog_probability 
+        self.fog_rolls = np.zeros((dim, dim), dtype=float)
+
+        # Flag patches drawn on the axes, keyed by (i, j).  Only populated 
+        #  while a figure exists 
+        self.flag_patches = dict()
+
+        # Mine count text or mine circle drawn on each excavated cell, keyed 
+        #  by (i, j).  Only populated while a figure exists 
+        self.cell_artists = dict()
+
+
+        # Running counters kept up to date by user_select() and _toggle_flag() 
+        #  so the gameover check and the score do not rescan the grid 
+        self.excavated_count = 0 
+        self.flag_count = 0 
+        self.correct_flags = 0 
+        self.incorrect_flags = 0 
+
+
+        # Undo journal of the excavations and flag toggles, kept while a 
+        #  snapshot can be restored.  Used by snapshot() and restore().  See 
+        #  journal.py 
+        self._journal = UndoJournal(dim)
+
+        # Callbacks given every change event.  See subscribe() 
+        self._subscribers = list()
 
 
         # Boolean marking if game is complete 
@@ -54,8 +153,52 @@ class JerkBoard():
         # Score value will be populated to this attribute upon gameover 
         self.score = None 
         
-        # Create the figure and axes 
-        self.fig = plt.figure(figsize=((dim + 2) / 3., (dim + 2) / 3.))
+        # Headless boards do not build the figure until something asks to 
+        #  render it (render() or _reveal_board()).  Agents skip drawing and 
+        #  sleeping in their solve loops whenever self.fig is None.  
+        self.headless = headless 
+        self.fig = None 
+        self.ax = None 
+        self.squares = None 
+
+        # Render pipeline.  Cells changed since the last frame, the canvas 
+        #  background the next frame is blitted over, and the frame rate cap 
+        self.max_fps = max_fps 
+        self._dirty = set()
+
+        # 'patches' draws one polygon per cell, 'raster' one image for the 
+        #  whole board.  _raster holds the RasterRenderer while a figure exists 
+        if renderer not in ('patches', 'raster'): 
+            raise ValueError("Unknown renderer {!r}".format(renderer))
+        self.renderer = renderer 
+        self._raster = None 
+        self._background = None 
+        self._last_frame = 0.0 
+        
+        
+        self.place_mines(mines) 
+        self.assign_mine_counts()
+        self.sample_fog()
+        
+        if not self.headless: 
+            self._init_figure()
+        
+       
+    
+    def _init_figure(self): 
+        """ Creates the figure, axes and grid of squares, then paints the 
+            current state of the game onto it.  
+        """
+        import matplotlib.pyplot as plt 
+
+        dim = self.dim 
+
+        # Create the figure and axes.  Raster boards stop growing the figure 
+        #  at 8 inches and shrink the cells instead 
+        size = (dim + 2) / 3. 
+        if self.renderer == 'raster': 
+            size = min(size, 8.)
+        self.fig = plt.figure(figsize=(size, size))
         self.ax = self.fig.add_axes((0.05, 0.05, 0.9, 0.9),
                                     aspect='equal', frameon=False,
                                     xlim=(-0.05, dim + 0.05),
@@ -65,6 +208,35 @@ class JerkBoard():
             axis.set_major_locator(plt.NullLocator())
 
 
+        # Event hook for mouse clicks
+        self.fig.canvas.mpl_connect('button_press_event', self._button_press)       
+
+        # Every full draw (including resizes) refreshes the blit background 
+        self.fig.canvas.mpl_connect('draw_event', self._capture_background)
+
+        self._paint_figure()
+
+
+
+    def _paint_figure(self): 
+        """ Adds the grid of squares to the axes and paints the current state 
+            of the game onto it 
+        """
+        from matplotlib.patches import RegularPolygon
+        from raster import RasterRenderer
+
+        dim = self.dim 
+
+        # The raster renderer paints the whole board into its one image 
+        if self.renderer == 'raster': 
+            if self._raster is None: 
+                # One image pixel per screen pixel of a cell, within [4, 16] 
+                cell = 0.9 * self.fig.get_figwidth() * self.fig.dpi / dim 
+                tile = int(np.clip(round(cell), 4, 16))
+                self._raster = RasterRenderer(self, self.ax, tile=tile)
+            self._raster.paint()
+            return 
+
         # Create the grid of squares
         self.squares = np.array([[RegularPolygon((i + 0.5, j + 0.5),
                                                  numVertices=4,
@@ -75,74 +247,261 @@ class JerkBoard():
                                   for j in range(dim)]
                                  for i in range(dim)])
         [self.ax.add_patch(sq) for sq in self.squares.flat]
-        
-        
-        self.place_mines() 
+
+        # Paint anything that happened before the figure existed 
+        for i, j in zip(*np.nonzero(self.excavated)): 
+            if self.cells[i, j] == -1: 
+                self._draw_exploded_mine(i, j)
+            else: 
+                self._draw_mine_count_value(i, j, fog=self.fogged[i, j])
+
+        for i, j in zip(*np.nonzero(self.flags)): 
+            self._add_flag_patch(i, j)
+
+
+
+    @classmethod
+    def from_corpus(cls, path, k, **kwargs): 
+        """ Returns a board playing layout k of the corpus file at path.  
+            The file is memory-mapped once per process and only record k is 
+            read.  Other keyword arguments go to JerkBoard().  See corpus.py 
+        """
+        mines = corpus.layout(path, k)
+        return cls(mines.shape[0], int(mines.sum()), mines=mines, **kwargs)
+
+
+
+    @property
+    def nbytes(self): 
+        """ Bytes held by the game state grids and the undo journal.  Figure 
+            artists are not counted 
+        """
+        grids = [self.cells, self.excavated, self.flags, self.fogged, self.fog_rolls, 
+                 self._visible]
+        return sum(grid.nbytes for grid in grids) + self._journal.nbytes
+
+
+
+    def render(self): 
+        """ Draws the board, building the figure first if it does not exist yet.
+            Returns the figure. 
+        """
+        if self.fig is None: 
+            self._init_figure()
+
+        self._full_draw()
+        return self.fig 
+
+
+
+    def draw(self, force=False): 
+        """ Pushes the cells changed since the last frame to the screen.  
+            Does nothing on boards without a figure.  
+
+            Frames are capped at max_fps.  Calls that come sooner return 
+            False and leave the cells dirty for a later frame, unless force 
+            is set.  Only the dirty cells are redrawn, blitted over the cached 
+            background, so the cost of a frame does not grow with the board.  
+            Returns True if a frame was drawn 
+        """
+        if self.fig is None: 
+            return False 
+
+        now = perf_counter()
+        if not force and self.max_fps and now - self._last_frame < 1.0 / self.max_fps: 
+            return False 
+        self._last_frame = now 
+
+        canvas = self.fig.canvas 
+
+        # No background to blit over yet.  Draw everything once instead 
+        if self._background is None or not getattr(canvas, 'supports_blit', False): 
+            self._full_draw(idle=True)
+            return True 
+
+        if self._dirty: 
+            canvas.restore_region(self._background)
+
+            if self._raster is not None: 
+                self._raster.update(self._dirty)
+                self.ax.draw_artist(self._raster.image)
+
+            # Square first so it paints over a removed flag, then what sits on it 
+            else: 
+                for (i, j) in self._dirty: 
+                    self.ax.draw_artist(self.squares[i, j])
+                    for artist in (self.cell_artists.get((i, j)), self.flag_patches.get((i, j))): 
+                        if artist is not None: 
+                            self.ax.draw_artist(artist)
+
+            canvas.blit(self.fig.bbox)
+
+            # This frame is the background of the next one 
+            self._background = canvas.copy_from_bbox(self.fig.bbox)
+            self._dirty.clear()
+
+        canvas.flush_events()
+        return True 
+
+
+
+    def _full_draw(self, idle=False): 
+        """ Redraws the whole figure.  The draw_event hook captures the new 
+            background.  idle=True lets the GUI do it on its next pass 
+        """
+        self._dirty.clear()
+        if idle: 
+            self.fig.canvas.draw_idle()
+        else: 
+            self.fig.canvas.draw()
+
+
+
+    def _capture_background(self, event): 
+        """ draw_event hook.  Caches the freshly drawn canvas for blitting 
+        """
+        if getattr(self.fig.canvas, 'supports_blit', False): 
+            self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+
+
+
+    def _mark_dirty(self, i, j): 
+        """ Queues cell (i, j) to be redrawn by the next draw() 
+        """
+        if self.fig is not None: 
+            self._dirty.add((i, j))
+
+
+
+    def close(self): 
+        """ Closes the figure (if any) and drops all references to its artists.
+            The game state is kept, so render() can rebuild the figure later.  
+        """
+        if self.fig is not None: 
+            import matplotlib.pyplot as plt 
+            plt.close(self.fig)
+
+        self.fig = None 
+        self.ax = None 
+        self.squares = None 
+        self.flag_patches = dict()
+        self.cell_artists = dict()
+        self._dirty = set()
+        self._background = None 
+        self._raster = None 
+
+
+
+
+    def reset(self, num_mines=None, fog_probability=None, seed=None, mines=None): 
+        """ Starts a new game on this board.  The grids, the figure and its 
+            squares are reused, so a sweep can play many games on one board 
+            without allocating a new one each time.  
+
+            num_mines changes the number of mines and fog_probability the 
+            chance of fog.  seed replaces the board's generator, to replay a 
+            layout and its fog rolls.  Resetting with the same seed and only a 
+            different fog_probability plays the same board with the fog 
+            threshold moved.  Without seed the board's generator carries on.  
+            mines gives the new layout directly, as in __init__().  Snapshots 
+            of the previous game are invalid afterwards 
+        """
+        if num_mines is not None: 
+            self.num_mines = num_mines 
+        if fog_probability is not None: 
+            self.fog_probability = fog_probability 
+        if seed is not None: 
+            self.rng = as_generator(seed)
+
+        # Clear the game state in place 
+        self.cells[:] = 0 
+        for grid in (self.excavated, self.flags, self.fogged): 
+            if self.compact: 
+                grid.clear()
+            else: 
+                grid[:] = False 
+        self._visible[:] = self.hidden_value 
+
+        self.excavated_count = 0 
+        self.flag_count = 0 
+        self.correct_flags = 0 
+        self.incorrect_flags = 0 
+
+        # The serial keeps counting, so old snapshot tokens stay rejected 
+        self._journal.clear()
+
+        self.gameover = False 
+        self.score = None 
+
+        self.place_mines(mines)
         self.assign_mine_counts()
-        
-        # Event hook for mouse clicks
-        self.fig.canvas.mpl_connect('button_press_event', self._button_press)       
-        
-       
+        self.sample_fog()
+        self._emit('reset', None, None, None)
+
+        # Turn the existing artists back into a covered board 
+        if self.fig is not None: 
+            if self._raster is not None: 
+                self._raster.paint()
+            else: 
+                for square in self.squares.flat: 
+                    square.set_facecolor('lightgray')
+                for artist in list(self.cell_artists.values()) + list(self.flag_patches.values()): 
+                    artist.remove()
+                self.cell_artists = dict()
+                self.flag_patches = dict()
+            self._full_draw()
+
+
             
-    def place_mines(self): 
+    def place_mines(self, mines=None): 
         """Randomly places self.num_mines across the grid.
             Mines are denoted by (-1) 
-        """
-        for mine_idx in range(self.num_mines): 
-            not_placed=True 
 
-            while(not_placed): 
-                i, j = np.random.randint(0, self.dim, 2)
+            Positions are sampled without replacement over the flattened grid.  
+            A (dim, dim) bool grid of mines is used as given instead, and 
+            sets self.num_mines 
+        """
+        if mines is not None: 
+            mines = np.asarray(mines, dtype=bool)
+            if mines.shape != (self.dim, self.dim): 
+                raise ValueError("Layout of shape {} does not fit a {}x{} board".format(
+                    mines.shape, self.dim, self.dim))
+            self.num_mines = int(mines.sum())
+            self.cells[mines] = -1 
+            return 
 
-                if self.cells[i, j] != -1: 
-                    # Place mine 
-                    self.cells[i, j] = -1
-                    not_placed=False 
+        positions = self.rng.choice(self.dim**2, self.num_mines, replace=False)
+        self.cells.flat[positions] = -1
         return 
     
     
     
+    def sample_fog(self): 
+        """ Draws the fog roll of every cell from the board's generator.  
+            Called right after the mines are placed, so the rolls depend on 
+            the seed only and not on the order the cells are excavated in 
+        """
+        self.rng.random(out=self.fog_rolls)
+
+
+
     def assign_mine_counts(self):
         """Assigns adjacentcy mine counts too all non-mine cells of the grid.  
             Mine counts can be [0, 8] and are written to self.cells   
+
+            Counts are the neighbor sums of the mine grid.  See neighbor_table.py 
         """
-        
-        for i in range(self.dim):
-            for j in range(self.dim): 
-                
-                mine_count = 0 
-                
-                # if (i,j) is not mine  
-                if self.cells[i, j] != -1: 
-                    
-                    # Neighbors in 8 directions (cardinal plus diagonal)
-                    neighbors = [(i+1, j), 
-                                (i, j+1), 
-                                (i-1, j), 
-                                (i, j-1), 
-                                (i+1, j+1), 
-                                (i+1, j-1), 
-                                (i-1, j+1), 
-                                (i-1, j-1), 
-                                ]
-
-                    for neighbor in neighbors: 
-                        
-                        # Check if neighbor is on the board 
-                        if (0 <= neighbor[0] < self.dim) and (0 <= neighbor[1] < self.dim):
-                            
-                            # Increment mine count for (i,j) if mine exists in neighbor 
-                            if self.cells[neighbor[0], neighbor[1]] == -1: 
-                                mine_count += 1
-
-                    # Assign minecount to cell[i, j]
-                    self.cells[i, j] = mine_count 
+
+        mines = (self.cells == -1)
+        counts = self._neighbors.sum(mines)
+
+        # Assign minecounts to all non-mine cells 
+        self.cells[~mines] = counts[~mines]
 
         return 
     
     
-    def user_select(self, i, j): 
+    def user_select(self, i, j, cascade=False): 
         """  User function for selecting cell (i, j).
 
                 If the cell has already been excavated: do nothing 
@@ -150,7 +509,30 @@ class JerkBoard():
                 If the cell has a mine: reveal the mine 
                 Otherwise: reveal the cell's mine count  
 
-            Returns -1 on mine or mine count integer value 
+            Returns -1 on mine, -2 on fog or mine count integer value 
+
+            With cascade=True, revealing a 0 also reveals its neighbors, flood 
+             filling the connected region of zeros.  Fogged zeros do not 
+             spread.  Returns a list of (i, j, value) for every revealed cell 
+             instead (empty if nothing was revealed) 
+        """
+
+        if cascade: 
+            revealed = self._cascade([(int(i), int(j))])
+            self._journal.record('select', [r for (r, _, _) in revealed], 
+                                 [c for (_, c, _) in revealed])
+            return revealed 
+
+        value = self._select(i, j)
+        if value is not None: 
+            self._journal.record('select', i, j)
+        return value 
+
+
+
+    def _select(self, i, j): 
+        """ Excavates cell (i, j) as user_select() does, without the cascade 
+            and without journaling it 
         """
         
         # If the cell is excavated, do nothing 
@@ -166,21 +548,29 @@ class JerkBoard():
         # If the cell is a mine, essplode 
         if self.cells[i, j] == -1: 
             self.excavated[i, j] = True 
+            self.excavated_count += 1 
+            self._visible[i, j] = -1 
+            self._emit('reveal', i, j, -1)
             self._draw_exploded_mine(i, j)
             return -1 
         
         # Otherwise, this is a regular safe cell. 
         self.excavated[i, j] = True 
+        self.excavated_count += 1 
 
-        # Sample for to see if the fog clouds the hint for the agent 
-        roll = np.random.uniform()
-        if roll <= self.fog_probability: 
+        # Check the cell's roll to see if the fog clouds the hint for the agent 
+        if self.fog_rolls[i, j] <= self.fog_probability: 
             # The fog wins.  Agent is not given the hint 
+            self.fogged[i, j] = True 
+            self._visible[i, j] = -2 
+            self._emit('fog', i, j, -2)
             self._draw_mine_count_value(i, j, fog=True)
             return -2  
 
         else: 
             # The agent is given the hint  
+            self._visible[i, j] = self.cells[i, j]
+            self._emit('reveal', i, j, int(self.cells[i, j]))
             self._draw_mine_count_value(i, j)
             return int(self.cells[i, j])
 
@@ -198,9 +588,139 @@ class JerkBoard():
             # Otherwise, toggle flag.  The helper function applies changes 
             #   to self.flags and adds/removes flag to self.ax + applies draw() 
             self._toggle_flag(i, j)
+            self._journal.record('flag', i, j)
+
+
 
 
 
+    def user_select_many(self, coords, cascade=False): 
+        """ User function for selecting many cells in one call.  
+
+            coords is a sequence or (n, 2) array of (i, j) pairs.  Each pair is 
+             handled as in user_select(), in order.  Fog comes from the same 
+             per-cell rolls as user_select() uses.  
+
+            With cascade=True, revealed 0s flood fill as in user_select() and a 
+             list of (i, j, value) for every revealed cell is returned instead 
+
+            Returns an int array of length n holding -1 on mine, -2 on fog or 
+             the mine count of the cell.  Cells that were skipped (already 
+             excavated, flagged or repeated in coords) hold self.skipped_value 
+        """
+
+        coords = np.asarray(coords, dtype=int).reshape(-1, 2)
+        i, j = coords[:, 0], coords[:, 1]
+        values = np.full(len(coords), self.skipped_value, dtype=int)
+
+        # Only the first occurrence of a cell can excavate it 
+        _, first = np.unique(i * self.dim + j, return_index=True)
+        selected = np.zeros(len(coords), dtype=bool)
+        selected[first] = True 
+
+        # Excavated and flagged cells are skipped 
+        selected &= ~self.excavated[i, j] & ~self.flags[i, j]
+        i, j = i[selected], j[selected]
+
+        self.excavated[i, j] = True 
+        self.excavated_count += len(i)
+        revealed = self.cells[i, j].astype(int)
+
+        # Look up the fog rolls of the safe cells 
+        safe = (revealed != -1)
+        fog = np.zeros(len(i), dtype=bool)
+        fog[safe] = self.fog_rolls[i[safe], j[safe]] <= self.fog_probability
+        self.fogged[i[fog], j[fog]] = True 
+        revealed[fog] = -2 
+        values[selected] = revealed 
+        self._visible[i, j] = revealed 
+        if self._subscribers: 
+            for r, c, value in zip(i.tolist(), j.tolist(), revealed.tolist()): 
+                self._emit('fog' if value == -2 else 'reveal', r, c, value)
+
+        if self.fig is not None: 
+            for r, c, value in zip(i, j, revealed): 
+                if value == -1: 
+                    self._draw_exploded_mine(r, c)
+                else: 
+                    self._draw_mine_count_value(r, c, fog=(value == -2))
+
+        if cascade: 
+            revealed = [(int(r), int(c), int(value)) for (r, c), value 
+                        in zip(coords[selected], values[selected])]
+            queue = [neighbor for (r, c, value) in revealed if value == 0 
+                     for neighbor in self._covered_neighbors(r, c)]
+            revealed += self._cascade(queue)
+
+            # One journal entry for the whole call, cascade included 
+            self._journal.record('select', [r for (r, _, _) in revealed], 
+                                 [c for (_, c, _) in revealed])
+            return revealed 
+
+        self._journal.record('select', i, j)
+        return values 
+
+
+
+    def _cascade(self, queue): 
+        """ Queue based flood fill for the cascade mode of user_select(). 
+            Selects every cell in the queue and queues the covered neighbors 
+            of each revealed 0.  
+
+            Returns a list of (i, j, value) for every cell revealed here 
+        """
+
+        out = []
+        queue = deque(queue)
+
+        while queue: 
+            i, j = queue.popleft()
+
+            value = self._select(i, j)
+            if value is None: 
+                continue 
+            out.append((i, j, value))
+
+            if value == 0: 
+                queue.extend(self._covered_neighbors(i, j))
+
+        return out 
+
+
+
+    def _covered_neighbors(self, i, j): 
+        """ Returns a list of the neighbors of (i, j) that are neither 
+            excavated nor flagged 
+        """
+
+        return [(r, c) for (r, c) in self._neighbors.of(i, j) 
+                if not self.excavated[r, c] and not self.flags[r, c]]
+
+
+
+    def user_flag_many(self, coords): 
+        """ User function for toggling flags on many cells in one call.  
+
+            coords is a sequence or (n, 2) array of (i, j) pairs.  Each pair is 
+             handled as in user_flag(), in order, and the canvas is redrawn 
+             at most once at the end.  
+        """
+
+        coords = np.asarray(coords, dtype=int).reshape(-1, 2)
+
+        toggled = [] 
+        for i, j in coords: 
+            # If the cell has already been excavated, do nothing 
+            if self.excavated[i, j]: 
+                continue 
+
+            self._toggle_flag(i, j, draw=False)
+            toggled.append((i, j))
+
+        if toggled: 
+            self._journal.record('flag', *np.transpose(toggled))
+            self.draw()
+
 
 
     def check_gameover_conditions(self): 
@@ -208,14 +728,16 @@ class JerkBoard():
             flag_count + excavated_count == total cells on board 
         """
 
-        flag_count = sum([bool(cell) for cell in self.flags.flatten()])
-        excavated_count = sum(sum(self.excavated))
-
-
-        if self.dim**2 == (flag_count + excavated_count):
+        if self.dim**2 == (self.flag_count + self.excavated_count):
+            finished = not self.gameover 
             self.gameover = True 
             # Calculate score 
             self._calculate_score()
+            # Announce the end once, not on every later check 
+            if finished: 
+                self._emit('gameover', None, None, self.score)
+            # Push the final frame even if the frame rate cap would skip it 
+            self.draw(force=True)
             return True 
 
         else: 
@@ -223,16 +745,144 @@ class JerkBoard():
 
 
 
+    def snapshot(self): 
+        """ Returns a token for the current state of the game.  Passing it to 
+            restore() rolls the board back to this state.  
+
+            Nothing is copied.  The token is a position in the undo journal, 
+            so taking a snapshot costs constant time.  The journal records 
+            moves from the first snapshot on, for as long as some token is 
+            still referenced.  See journal.py 
+        """
+        return self._journal.snapshot()
+
+
+
+    def restore(self, token): 
+        """ Rolls the game back to the state captured by snapshot().  Every 
+            excavation and flag toggle made since then is undone.  
+
+            Tokens for states that were rolled back past and then overwritten 
+            by new actions, or taken before reset(), are rejected with a 
+            ValueError 
+        """
+
+        # Undo the journal entries newer than the snapshot, latest first 
+        for action, i, j in self._journal.rewind(token): 
+            if action == 'select': 
+                self._hide(i, j)
+            else: 
+                self._toggle_flag(i, j, draw=False)
+
+        # Snapshots are taken during play.  Undo the gameover if the board is 
+        #  no longer complete  
+        if self.dim**2 != (self.flag_count + self.excavated_count): 
+            self.gameover = False 
+            self.score = None 
+
+        # Artists are not journaled.  Repaint the figure from the restored state 
+        if self.fig is not None: 
+            for artist in list(self.ax.patches) + list(self.ax.texts): 
+                artist.remove()
+            self.flag_patches = dict()
+            self.cell_artists = dict()
+            self._paint_figure()
+            self._full_draw()
+
+
+
+    def _hide(self, i, j): 
+        """ Covers the excavated cell (i, j) again.  Used by restore() to undo 
+            an excavation and by replay.py to replay one.  Not journaled 
+        """
+        self.excavated[i, j] = False 
+        self._visible[i, j] = self.hidden_value 
+        self.fogged[i, j] = False 
+        self._emit('hide', i, j, None)
+        self.excavated_count -= 1 
+
+        # A covered cell means the game is not over 
+        self.gameover = False 
+        self.score = None 
+
+
+
+    def observation(self): 
+        """ Returns read-only arrays of what the agent is allowed to see: 
+
+                visible     int8 grid.  The value user_select() returned for 
+                            each excavated cell, hidden_value where covered
+                excavated   bool grid.  True where the cell was excavated 
+                flags       bool grid.  True where a flag is placed 
+
+            They are views of the board's own grids, so they stay current as 
+             the game goes on and cost nothing to fetch.  Compact boards 
+             return copies of excavated and flags instead, unpacked from the 
+             bit-packed grids.  None of them can be written to, and nothing 
+             about covered cells (mines) is exposed 
+        """
+        visible = self._visible.view()
+        visible.flags.writeable = False 
+
+        excavated = (visible != self.hidden_value) if self.compact else self.excavated.view()
+        excavated.flags.writeable = False 
+
+        flags = np.asarray(self.flags) if self.compact else self.flags.view()
+        flags.flags.writeable = False 
+
+        return visible, excavated, flags 
+
+
+
+    def subscribe(self, callback): 
+        """ Registers callback(event) to be called on every change of the 
+            board, with an events.Event.  Returns a function that removes 
+            the subscription again 
+        """
+        self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback)
+
+
+
+    def events(self): 
+        """ Returns an events.EventStream buffering every change from now 
+            on.  Iterating over it drains what happened since the last pass 
+        """
+        return EventStream(self)
+
+
+
+    def _emit(self, kind, i, j, value): 
+        """ Hands an event to the subscribers.  Costs one check when there 
+            are none 
+        """
+        if not self._subscribers: 
+            return 
+
+        if i is not None: 
+            i, j = int(i), int(j)
+        event = Event(kind, i, j, value)
+        for callback in list(self._subscribers): 
+            callback(event)
+
+
+
     def _reveal_board(self):
         """ Reveals all cells of the board.  WARNING: flag state is removed 
         """
 
+        if self.fig is None: 
+            self._init_figure()
+
+        removed = [] 
         for i in range(self.dim): 
             for j in range(self.dim): 
 
-                # remove flag if present 
+                # remove flag if present.  Journaled so restore() can put 
+                #  it back 
                 if self.flags[i, j]: 
-                    self._toggle_flag(i, j)
+                    self._toggle_flag(i, j, draw=False)
+                    removed.append((i, j))
 
                 # if mine, draw mine 
                 if self.cells[i, j] == -1: 
@@ -240,6 +890,13 @@ class JerkBoard():
 
                 else: 
                     self._draw_mine_count_value(i, j)
+
+        if removed: 
+            self._journal.record('flag', *np.transpose(removed))
+
+        if self._raster is not None: 
+            self._raster.paint(reveal=True)
+        self._full_draw()
         return 
 
 
@@ -264,8 +921,8 @@ class JerkBoard():
         if event.button == 3: 
             self.user_flag(i, j)
 
-        # Redraw canvas 
-        self.fig.canvas.draw()
+        # Redraw the clicked cell right away 
+        self.draw(force=True)
       
 
 
@@ -274,74 +931,133 @@ class JerkBoard():
         """ Calculates the current point value according to the state of the board
 
                 For each correctly placed flag, one point is earned.  
-                Uses self.flag and self.cells as global truth of the state of the game 
+                For each incorrectly placed flag, one point is lost.  
+                Uses the flag counters maintained by _toggle_flag() 
         """
 
-        correct = 0 
-        incorrect = 0 
-
-        for i in range(self.dim):
-            for j in range(self.dim): 
-
-                # cell (i, j) has a flag and has a mine 
-                if (bool(self.flags[i, j])) and (self.cells[i, j] == -1):
-                    correct += 1
-
-                # cell has a flag and no mine 
-                if (bool(self.flags[i, j])) and (self.cells[i, j] != -1):
-                    incorrect += 1
-
-
-
-        self.score = (correct - incorrect) / self.num_mines 
+        self.score = (self.correct_flags - self.incorrect_flags) / self.num_mines 
 
 
 
     def _draw_mine_count_value(self, i, j, fog=False): 
         """Draws colored mine count value at cell @ i, j
         """
+        if self.fig is None: 
+            return 
+
+        if self._raster is not None: 
+            self._mark_dirty(i, j)
+            return 
+
+        self._clear_cell_artist(i, j)
         self.squares[i, j].set_facecolor('white')
 
         # If fog applies, then print a '?' to represent that the agent dont know 
         if fog: 
-            self.ax.text(i + 0.5, j + 0.5, '?',
-                         color='purple',
-                         ha='center', va='center', fontsize=18,
-                         fontweight='bold')
+            artist = self.ax.text(i + 0.5, j + 0.5, '?',
+                                  color='purple',
+                                  ha='center', va='center', fontsize=18,
+                                  fontweight='bold')
+            self.cell_artists[(i, j)] = artist
             return 
 
 
-        self.ax.text(i + 0.5, j + 0.5, str(int(self.cells[i, j])),
-                     color=self.count_colors[int(self.cells[i, j])],
-                     ha='center', va='center', fontsize=18,
-                     fontweight='bold')
+        artist = self.ax.text(i + 0.5, j + 0.5, str(int(self.cells[i, j])),
+                              color=self.count_colors[int(self.cells[i, j])],
+                              ha='center', va='center', fontsize=18,
+                              fontweight='bold')
+        self.cell_artists[(i, j)] = artist
 
 
     def _draw_mine(self, i, j): 
         """ Draws mine at cell @ i, j.  Mine is black and gray 
         """
+        if self.fig is None: 
+            return 
+
+        if self._raster is not None: 
+            self._mark_dirty(i, j)
+            return 
+
+        import matplotlib.pyplot as plt 
+
+        self._clear_cell_artist(i, j)
         self.squares[i, j].set_facecolor('white')
-        self.ax.add_patch(plt.Circle((i + 0.5, j + 0.5), radius=0.25,
-                                     ec='black', fc='gray'))
+        artist = self.ax.add_patch(plt.Circle((i + 0.5, j + 0.5), radius=0.25,
+                                              ec='black', fc='gray'))
+        self.cell_artists[(i, j)] = artist
     
     
     def _draw_exploded_mine(self, i, j):
         """ Draws exploded mine at cell @ i, j.  Mine is black and red.  
         """
+        if self.fig is None: 
+            return 
+
+        if self._raster is not None: 
+            self._mark_dirty(i, j)
+            return 
+
+        import matplotlib.pyplot as plt 
+
+        self._clear_cell_artist(i, j)
         self.squares[i, j].set_facecolor('white')
-        self.ax.add_patch(plt.Circle((i + 0.5, j + 0.5), radius=0.25,
-                                     ec='black', fc='orangered'))
+        artist = self.ax.add_patch(plt.Circle((i + 0.5, j + 0.5), radius=0.25,
+                                              ec='black', fc='orangered'))
+        self.cell_artists[(i, j)] = artist
 
             
         
-    def _toggle_flag(self, i, j):
-        """ Toggles flag image on cell at i, j
+    def _toggle_flag(self, i, j, draw=True):
+        """ Toggles flag on cell at i, j.  The flag image is only drawn when 
+            the figure exists.  Pass draw=False to skip redrawing the canvas 
         """
-        if self.flags[i, j]:
-            self.ax.patches.remove(self.flags[i, j])
-            self.flags[i, j] = None
+        self.flags[i, j] = not self.flags[i, j]
+
+        # Keep the flag counters in step.  change is +1 on place, -1 on removal 
+        change = 1 if self.flags[i, j] else -1 
+        self.flag_count += change 
+        if self.cells[i, j] == -1: 
+            self.correct_flags += change 
+        else: 
+            self.incorrect_flags += change 
+
+        self._emit('flag', i, j, change == 1)
+
+        if self.fig is None: 
+            return 
+
+        if self._raster is not None: 
+            self._mark_dirty(i, j)
+        elif self.flags[i, j]:
+            self._add_flag_patch(i, j)
         else:
-            self.flags[i, j] = plt.Polygon(self.flag_vertices + [i, j],
-                                            fc='red', ec='black', lw=2)
-            self.ax.add_patch(self.flags[i, j])
-        self.fig.canvas.draw()
+            self.flag_patches.pop((i, j)).remove()
+            self._mark_dirty(i, j)
+
+        if draw: 
+            self.draw()
+
+
+
+    def _add_flag_patch(self, i, j): 
+        """ Adds the flag image for cell at i, j to the axes 
+        """
+        import matplotlib.pyplot as plt 
+
+        patch = plt.Polygon(self.flag_vertices + [i, j],
+                            fc='red', ec='black', lw=2)
+        self.ax.add_patch(patch)
+        self.flag_patches[(i, j)] = patch
+        self._mark_dirty(i, j)
+
+
+
+    def _clear_cell_artist(self, i, j): 
+        """ Removes the count text or mine drawn on cell at i, j (if any) and 
+            marks the cell dirty.  Cells hold at most one such artist 
+        """
+        artist = self.cell_artists.pop((i, j), None)
+        if artist is not None: 
+            artist.remove()
+        self._mark_dirty(i, j) 
@@ -0,0 +1,152 @@
+""" Undo journal behind board.snapshot() and board.restore().
+
+    The journal only records while a snapshot can still be restored.  It
+    starts with the first snapshot() and stops, dropping what it holds, once
+    every Snapshot token has been garbage collected.  A game played without
+    snapshots pays one check per move and keeps nothing.
+
+    Each entry is one user call, (serial, action, cells).  action is 'select'
+    or 'flag' and cells the flat index i * dim + j of the one cell changed,
+    or an unsigned int array of the cells changed by a batch or a cascade, in
+    the order they changed.
+"""
+import sys
+import weakref
+import numpy as np
+
+
+
+
+class Snapshot():
+    """ Token returned by snapshot().  Unpacks as (position, serial): the
+        number of journal entries and the serial of the last one
+    """
+
+    __slots__ = ('position', 'serial', '__weakref__')
+
+    def __init__(self, position, serial):
+        self.position = position
+        self.serial = serial
+
+
+    def __iter__(self):
+        return iter((self.position, self.serial))
+
+
+    def __repr__(self):
+        return "Snapshot({}, {})".format(self.position, self.serial)
+
+
+
+
+class UndoJournal():
+    """ Undo journal of a dim x dim board.  See the module docstring
+    """
+
+    def __init__(self, dim):
+        self.dim = dim
+        self._dtype = np.min_scalar_type(dim * dim - 1)
+        self._entries = list()
+        self._serial = 0
+
+        # Live Snapshot tokens.  Recording stops when the last one goes
+        self._snapshots = weakref.WeakSet()
+
+        # Serial of the empty journal, so tokens from before a clear() are
+        #  rejected
+        self._base = self._next_serial()
+
+
+
+    def _next_serial(self):
+        serial = self._serial
+        self._serial += 1
+        return serial
+
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+
+    @property
+    def recording(self):
+        """ True while some snapshot can still be restored
+        """
+        if self._snapshots:
+            return True
+        if self._entries:
+            self.clear()
+        return False
+
+
+
+    @property
+    def nbytes(self):
+        """ Bytes held by the entries, their tuples and cell indices included
+        """
+        return sum(sys.getsizeof(entry) + sys.getsizeof(entry[2]) for entry in self._entries)
+
+
+
+    def record(self, action, i, j):
+        """ Records an excavation ('select') or flag toggle ('flag') of cell
+            (i, j), or of cells (i[k], j[k]) in order as a single entry
+        """
+        if not self.recording:
+            return
+
+        if np.ndim(i) == 0:
+            cells = int(i) * self.dim + int(j)
+        else:
+            cells = np.asarray(i, dtype=np.int64) * self.dim + np.asarray(j, dtype=np.int64)
+            if not len(cells):
+                return
+            cells = cells.astype(self._dtype)
+
+        self._entries.append((self._next_serial(), action, cells))
+
+
+
+    def snapshot(self):
+        """ Returns a Snapshot of the current position.  Recording starts
+            here if it was off
+        """
+        serial = self._entries[-1][0] if self._entries else self._base
+        token = Snapshot(len(self._entries), serial)
+        self._snapshots.add(token)
+        return token
+
+
+
+    def rewind(self, token):
+        """ Drops the entries newer than token.  Returns the (action, i, j)
+            changes they hold, latest first, for the board to undo.
+
+            Tokens for states that were rolled back past and then overwritten
+            by new entries, or taken before a clear(), raise a ValueError
+        """
+        position, serial = token
+        if position == 0:
+            valid = (serial == self._base)
+        else:
+            valid = position <= len(self._entries) and self._entries[position - 1][0] == serial
+        if not valid:
+            raise ValueError("{} is no longer valid".format(token))
+
+        undo = []
+        while len(self._entries) > position:
+            _, action, cells = self._entries.pop()
+            for k in reversed(np.atleast_1d(cells).tolist()):
+                undo.append((action,) + divmod(k, self.dim))
+        return undo
+
+
+
+    def clear(self):
+        """ Empties the journal and invalidates every snapshot taken so far
+        """
+        self._entries.clear()
+        self._snapshots.clear()
+        self._base = self._next_serial()
@@ -0,0 +1,154 @@
+""" Precomputed 8-neighbor tables shared by the boards and the agents.
+
+    neighbor_table(dim, torus=False) returns the table of a dim x dim grid.
+    Tables are cached per (dim, torus) for the last few grid sizes, so every
+    board and agent on a grid of that size shares the same one:
+
+        table = neighbor_table(16)
+        table.of(i, j)          neighbors of (i, j) as a tuple of (r, c),
+                                computed on demand from offsets
+        table.flat[k]           neighbors of flat cell k as flat indices
+        table.indptr/indices    the same in CSR form: the neighbors of flat
+                                cell k are indices[indptr[k]:indptr[k+1]]
+        table.degree            (dim, dim) number of neighbors of each cell
+        table.sum(grid)         every cell's neighbor sum of grid
+
+    On a bounded grid edge cells have 5 neighbors and corners 3.  A torus
+    wraps around both axes, so every cell has 8.  Each part of the table is
+    built the first time it is used.  of(), degree and sum() never build
+    anything per cell, so boards and agents on huge grids only pay for the
+    cells they touch.  flat and the CSR arrays hold every cell and are meant
+    for small grids, such as the corpus boards of no_guess.py.
+"""
+import numpy as np
+from functools import cached_property, lru_cache
+
+
+# Neighbor offsets in 8 directions (cardinal plus diagonal)
+offsets = tuple((di, dj) for di in (-1, 0, 1) for dj in (-1, 0, 1)
+                if (di, dj) != (0, 0))
+
+
+
+
+@lru_cache(maxsize=16)
+def neighbor_table(dim, torus=False):
+    """ Returns the shared NeighborTable of a dim x dim grid
+    """
+    return NeighborTable(dim, bool(torus))
+
+
+
+
+class NeighborTable():
+    """ Neighbors of every cell of a dim x dim grid.  See neighbor_table()
+    """
+
+    def __init__(self, dim, torus=False):
+        self.dim = dim
+        self.torus = torus
+
+
+
+    @cached_property
+    def _csr(self):
+        dim = self.dim
+        rows, cols = np.divmod(np.arange(dim * dim), dim)
+
+        # One column of candidate neighbors per offset, -1 where it falls off
+        #  the grid.  A torus wraps the coordinates instead
+        candidates = np.full((dim * dim, len(offsets)), -1, dtype=np.int32)
+        for k, (di, dj) in enumerate(offsets):
+            r, c = rows + di, cols + dj
+            if self.torus:
+                r, c = r % dim, c % dim
+                candidates[:, k] = r * dim + c
+            else:
+                inside = (0 <= r) & (r < dim) & (0 <= c) & (c < dim)
+                candidates[inside, k] = (r * dim + c)[inside]
+
+        # Tiny tori (dim < 3) reach the same cell through several offsets, and
+        #  dim 1 reaches the cell itself.  Keep each neighbor once
+        if self.torus and dim < 3:
+            for k in range(dim * dim):
+                seen = set()
+                for n, x in enumerate(candidates[k]):
+                    if x == k or x in seen:
+                        candidates[k, n] = -1
+                    seen.add(x)
+
+        valid = candidates >= 0
+        indptr = np.zeros(dim * dim + 1, dtype=np.int32)
+        np.cumsum(valid.sum(axis=1), out=indptr[1:])
+        return indptr, candidates[valid]
+
+
+
+    @property
+    def indptr(self):
+        return self._csr[0]
+
+
+
+    @property
+    def indices(self):
+        return self._csr[1]
+
+
+
+    @cached_property
+    def degree(self):
+        """ (dim, dim) int8 grid of the number of neighbors of each cell
+        """
+        return self.sum(np.ones((self.dim, self.dim), dtype=np.int8))
+
+
+
+    @cached_property
+    def flat(self):
+        """ Tuple indexed by flat cell index of tuples of flat neighbor indices
+        """
+        indptr, indices = self.indptr.tolist(), self.indices.tolist()
+        return tuple(tuple(indices[indptr[k]:indptr[k + 1]])
+                     for k in range(self.dim * self.dim))
+
+
+
+    def of(self, i, j):
+        """ Returns the neighbors of (i, j) as a tuple of (r, c) tuples, in
+            the order of offsets.  Computed on each call, so nothing per cell
+            is kept
+        """
+        dim, i, j = self.dim, int(i), int(j)
+        if self.torus:
+            if dim < 3:
+                return tuple(divmod(x, dim) for x in self.flat[i * dim + j])
+            return tuple(((i + di) % dim, (j + dj) % dim) for di, dj in offsets)
+
+        return tuple((i + di, j + dj) for di, dj in offsets
+                     if 0 <= i + di < dim and 0 <= j + dj < dim)
+
+
+
+    def sum(self, grid):
+        """ Returns every cell's neighbor sum of a (dim, dim) grid as int8.
+
+            Done as a sum of the eight shifted slices of a padded copy of the
+            grid, zero padded on a bounded grid and wrapped on a torus.  This
+            needs no per-cell index arrays, so it stays cheap on huge boards
+        """
+        if self.torus and self.dim < 3:
+            values = np.asarray(grid, dtype=np.int8).ravel()
+            out = np.zeros(self.dim * self.dim, dtype=np.int8)
+            for k, nbrs in enumerate(self.flat):
+                out[k] = values[list(nbrs)].sum()
+            return out.reshape(self.dim, self.dim)
+
+        dim = self.dim
+        padded = np.pad(np.asarray(grid, dtype=np.int8), 1,
+                        mode='wrap' if self.torus else 'constant')
+
+        out = np.zeros((dim, dim), dtype=np.int8)
+        for di, dj in offsets:
+            out += padded[1+di:1+di+dim, 1+dj:1+dj+dim]
+        return out
@@ -0,0 +1,289 @@
+""" Generates boards that can be solved from the first click without a guess.
+
+    Every agent opens (0, 0) first, so a no-guess layout keeps the start cell
+    and its neighbors free of mines, which makes the first click open a zero
+    cascade.  From there deduce() plays the board with two sound rules:
+
+        single cell   a revealed count whose missing mines equal its unknown
+                      neighbors flags them all, one with no missing mines
+                      clears them all
+        pairs         for two overlapping counts A and B, if A needs as many
+                      more mines than B as A has cells outside B, those cells
+                      are mines and B's cells outside A are safe
+
+    A layout passes when every cell ends up revealed or known to be a mine,
+    without using the total mine count.  CNF_Agent's knowledgebase covers
+    both rules, so it solves these boards without random clicks.
+    BasicAgent only has the single cell rule and may still have to guess.
+
+    Layouts that get stuck are repaired in place rather than thrown away.  A
+    mine on the stuck frontier moves to an unexplored cell and the board is
+    deduced again.  Throwing the layout away is the last resort.
+
+        mines = generate_layout(16, 40, rng=0)
+        board = Board(16, 40, mines=mines)
+
+    generate_corpus() fills a corpus file (see corpus.py) on a process pool,
+    for Board.from_corpus():
+
+        python no_guess.py boards.npy --dim 16 --mines 40 -n 10000 --processes 4
+"""
+import numpy as np
+from collections import deque
+import corpus
+from seeding import as_generator
+from neighbor_table import neighbor_table
+
+
+# Cell opened by the agents' first click
+start = (0, 0)
+
+# Layouts built per block of a corpus.  Small, so the blocks spread evenly
+#  over the pool
+block_layouts = 64
+
+# States of deduce()
+UNKNOWN, SAFE, MINE = 0, 1, 2
+
+
+
+
+def _neighbors(dim):
+    """ Returns the flat indices of every cell's neighbors, as a tuple of
+        tuples indexed by flat cell index.  See neighbor_table.py
+    """
+    return neighbor_table(dim).flat
+
+
+
+def _start_zone(dim):
+    """ Returns the flat indices of the start cell and its neighbors
+    """
+    first = start[0] * dim + start[1]
+    return (first,) + _neighbors(dim)[first]
+
+
+
+def deduce(counts, dim):
+    """ Plays a board from the start cell using only the single cell and pair
+        rules.  counts is the flat list of every cell's mine count.  Only the
+        counts of revealed cells are read, so values on mines do not matter.
+
+        Returns a flat bytearray of UNKNOWN, SAFE (revealed) or MINE (known)
+        per cell
+    """
+    nbrs = _neighbors(dim)
+    state = bytearray(dim * dim)
+    queued = bytearray(dim * dim)
+    queue = deque()
+
+    def push(c):
+        if not queued[c]:
+            queued[c] = 1
+            queue.append(c)
+
+    def reveal(cells):
+        stack = list(cells)
+        while stack:
+            c = stack.pop()
+            if state[c] != UNKNOWN:
+                continue
+            state[c] = SAFE
+            push(c)
+            for x in nbrs[c]:
+                # Revealed neighbors have one unknown cell less to explain
+                if state[x] == SAFE:
+                    push(x)
+                # Zeros cascade, as on the board
+                elif counts[c] == 0:
+                    stack.append(x)
+
+    def mark(cells):
+        for c in cells:
+            if state[c] != UNKNOWN:
+                continue
+            state[c] = MINE
+            for x in nbrs[c]:
+                if state[x] == SAFE:
+                    push(x)
+
+    reveal(_start_zone(dim)[:1])
+
+    while True:
+        # Single cell rule, until nothing is left to check
+        while queue:
+            c = queue.popleft()
+            queued[c] = 0
+
+            unknown = [x for x in nbrs[c] if state[x] == UNKNOWN]
+            if not unknown:
+                continue
+
+            need = counts[c] - sum(1 for x in nbrs[c] if state[x] == MINE)
+            if need == 0:
+                reveal(unknown)
+            elif need == len(unknown):
+                mark(unknown)
+
+        safe, mines = _pair_rule(counts, nbrs, state)
+        if not safe and not mines:
+            return state
+
+        reveal(safe)
+        mark(mines)
+
+
+
+def _pair_rule(counts, nbrs, state):
+    """ Applies the pair rule to every two counts that share an unknown cell.
+        Returns the sets of cells it shows to be safe and to be mines
+    """
+    # Every revealed count with unknown neighbors, as (unknown cells, mines
+    #  still needed), and the counts each unknown cell belongs to
+    constraints = []
+    members = dict()
+    for c in range(len(state)):
+        if state[c] != SAFE:
+            continue
+
+        unknown = frozenset(x for x in nbrs[c] if state[x] == UNKNOWN)
+        if not unknown:
+            continue
+
+        need = counts[c] - sum(1 for x in nbrs[c] if state[x] == MINE)
+        for x in unknown:
+            members.setdefault(x, []).append(len(constraints))
+        constraints.append((unknown, need))
+
+    safe, mines = set(), set()
+    for a, (cells_a, need_a) in enumerate(constraints):
+        others = {b for x in cells_a for b in members[x] if b != a}
+        for b in others:
+            cells_b, need_b = constraints[b]
+            only_a = cells_a - cells_b
+            if need_a - need_b == len(only_a):
+                mines |= only_a
+                safe |= cells_b - cells_a
+
+    return safe, mines
+
+
+
+def _counts(mines, dim):
+    """ Returns every cell's mine count as a flat list
+    """
+    nbrs = _neighbors(dim)
+    return [sum(mines[x] for x in nbrs[c]) for c in range(dim * dim)]
+
+
+
+def generate_layout(dim, num_mines, rng=None, max_repairs=None, max_layouts=100):
+    """ Returns a (dim, dim) bool mine grid that deduce() solves from the
+        start cell.
+
+        A stuck layout is repaired up to max_repairs times (dim**2 by
+        default) before a fresh one is drawn.  A RuntimeError is raised after
+        max_layouts fresh layouts, which only happens when the board is too
+        dense to be solved without guessing
+    """
+    rng = as_generator(rng)
+    cells = dim * dim
+    zone = _start_zone(dim)
+    if not 0 <= num_mines <= cells - len(zone):
+        raise ValueError("Cannot place {} mines on a {}x{} board and keep the start clear".format(
+            num_mines, dim, dim))
+
+    nbrs = _neighbors(dim)
+    max_repairs = cells if max_repairs is None else max_repairs
+    free = np.setdiff1d(np.arange(cells), zone)
+
+    for _ in range(max_layouts):
+        mines = bytearray(cells)
+        for c in rng.choice(free, num_mines, replace=False).tolist():
+            mines[c] = 1
+        counts = _counts(mines, dim)
+
+        for _ in range(max_repairs + 1):
+            state = deduce(counts, dim)
+            unresolved = [c for c in range(cells) if state[c] == UNKNOWN]
+            if not unresolved:
+                return np.frombuffer(mines, dtype=np.uint8).reshape(dim, dim).astype(bool)
+
+            move = _repair(mines, state, unresolved, nbrs, zone, rng)
+            if move is None:
+                break
+
+            # Move the mine and patch the counts around both cells
+            src, dst = move
+            mines[src], mines[dst] = 0, 1
+            for x in nbrs[src]:
+                counts[x] -= 1
+            for x in nbrs[dst]:
+                counts[x] += 1
+
+    raise RuntimeError("No no-guess layout of {} mines on a {}x{} board after {} tries".format(
+        num_mines, dim, dim, max_layouts))
+
+
+
+def _repair(mines, state, unresolved, nbrs, zone, rng):
+    """ Picks a mine to move out of the stuck region and where to put it.
+        Returns (source, destination) flat indices, or None when no move is
+        left
+    """
+    # The frontier is the unresolved cells next to revealed ones.  Its mines
+    #  are what blocks progress
+    frontier = [c for c in unresolved if any(state[x] == SAFE for x in nbrs[c])]
+    sources = [c for c in frontier if mines[c]] or [c for c in unresolved if mines[c]]
+
+    # Prefer unexplored cells away from the frontier, so the move opens the
+    #  frontier without closing it again
+    frontier = set(frontier)
+    zone = set(zone)
+    targets = [c for c in unresolved if not mines[c] and c not in frontier]
+    if not targets:
+        targets = [c for c in range(len(mines)) if not mines[c] and c not in zone]
+
+    if not sources or not targets:
+        return None
+
+    return (sources[rng.integers(len(sources))], targets[rng.integers(len(targets))])
+
+
+
+def generate_corpus(path, dim, num_mines, n, seed=None, processes=None):
+    """ Writes n no-guess layouts to a corpus file at path.  Same format,
+        seeding and process pool as corpus.generate_corpus()
+    """
+    if not 0 <= num_mines <= dim**2 - len(_start_zone(dim)):
+        raise ValueError("Cannot place {} mines on a {}x{} board and keep the start clear".format(
+            num_mines, dim, dim))
+
+    corpus.fill_blocks(_fill_block, path, dim, num_mines, n, block_layouts,
+                       seed=seed, processes=processes)
+
+
+
+def _fill_block(block):
+    path, dim, num_mines, start_k, stop_k, seed = block
+    rng = np.random.default_rng(seed)
+    mines = np.array([generate_layout(dim, num_mines, rng) for _ in range(stop_k - start_k)])
+    corpus.write_block(path, start_k, mines.reshape(-1, dim, dim))
+
+
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a corpus of no-guess board layouts")
+    parser.add_argument('path')
+    parser.add_argument('--dim', type=int, required=True)
+    parser.add_argument('--mines', type=int, required=True)
+    parser.add_argument('-n', type=int, required=True)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args()
+
+    generate_corpus(args.path, args.dim, args.mines, args.n, seed=args.seed,
+                    processes=args.processes)
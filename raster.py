@@ -0,0 +1,194 @@
+""" Raster renderer for Board and JerkBoard.
+
+    The patch renderer of the boards adds one polygon per cell plus a text or
+    patch artist for every cell revealed.  This one draws the whole board as a
+    single RGB image shown by one imshow artist.  Every cell state has a glyph
+    tile, rasterized once per tile size, and the image is put together by
+    indexing the tile stack with an array of cell states.
+"""
+import numpy as np
+from functools import lru_cache
+from matplotlib.path import Path
+from matplotlib.textpath import TextPath
+from matplotlib.font_manager import FontProperties
+from matplotlib.colors import to_rgb
+
+
+
+# Tile indices.  COUNT + n is the tile of mine count n
+COVERED = 0
+COUNT = 1
+MINE = 10
+EXPLODED = 11
+FLAG = 12
+FOG = 13
+
+count_colors = ['none', 'blue', 'green', 'red', 'darkblue',
+                'darkred', 'darkgreen', 'black', 'black']
+
+flag_vertices = np.array([[0.25, 0.2], [0.25, 0.8],
+                          [0.75, 0.65], [0.25, 0.5]])
+
+
+
+
+def _coverage(path, tile, supersample=4):
+    """ Returns a (tile, tile) float array of how much of each pixel the path
+        covers, for a path in unit cell coordinates.  Row 0 is the bottom
+    """
+    n = tile * supersample
+    centers = (np.arange(n) + 0.5) / n
+    x, y = np.meshgrid(centers, centers)
+    inside = path.contains_points(np.column_stack([x.ravel(), y.ravel()]))
+    return inside.reshape(tile, supersample, tile, supersample).mean(axis=(1, 3))
+
+
+
+def _glyph_path(text):
+    """ Returns the outline of text, bold, scaled and centered in the unit cell
+    """
+    path = TextPath((0, 0), text, size=1, prop=FontProperties(weight='bold'))
+    extents = path.get_extents()
+    scale = 0.6 / max(extents.width, extents.height)
+    vertices = (path.vertices - [extents.x0 + extents.width / 2,
+                                 extents.y0 + extents.height / 2]) * scale + 0.5
+    return Path(vertices, path.codes)
+
+
+
+def _paint(tile, coverage, color):
+    """ Blends color into the (t, t, 3) RGB tile with the coverage as alpha
+    """
+    alpha = coverage[..., None]
+    return tile * (1 - alpha) + np.array(to_rgb(color)) * alpha
+
+
+
+@lru_cache(maxsize=None)
+def glyph_tiles(tile=16):
+    """ Returns the (14, tile, tile, 4) uint8 RGBA stack of glyph tiles.  See
+        the tile indices at the top of the module.  Cached per tile size.
+        RGBA uint8 is what imshow draws without converting the data first
+    """
+
+    def square(color):
+        # Cell background with a one pixel black border, like the patches
+        out = np.empty((tile, tile, 3))
+        out[:] = to_rgb(color)
+        out[[0, -1], :] = 0
+        out[:, [0, -1]] = 0
+        return out
+
+    circle = Path.circle((0.5, 0.5), 0.25)
+    disc = _coverage(circle, tile)
+    ring = disc - _coverage(Path.circle((0.5, 0.5), 0.25 - 1.5 / tile), tile)
+
+    tiles = [square('lightgray')]
+
+    # Mine counts.  0 is a blank white cell
+    tiles.append(square('white'))
+    for n in range(1, 9):
+        tiles.append(_paint(square('white'), _coverage(_glyph_path(str(n)), tile),
+                            count_colors[n]))
+
+    for fill in ('gray', 'orangered'):
+        mine = _paint(square('white'), disc, fill)
+        tiles.append(_paint(mine, ring, 'black'))
+
+    flag = Path(np.vstack([flag_vertices, flag_vertices[:1]]), closed=True)
+    tiles.append(_paint(square('lightgray'), _coverage(flag, tile), 'red'))
+
+    tiles.append(_paint(square('white'), _coverage(_glyph_path('?'), tile), 'purple'))
+
+    tiles = (np.stack(tiles) * 255).round().astype(np.uint8)
+    opaque = np.full(tiles.shape[:-1] + (1,), 255, dtype=np.uint8)
+    return np.concatenate([tiles, opaque], axis=-1)
+
+
+
+
+def cell_states(board, i=None, j=None, reveal=False):
+    """ Returns the tile index of cells (i[k], j[k]) of board, or of the whole
+        (dim, dim) board when no cells are given.  With reveal=True covered
+        cells show what is under them
+    """
+
+    # Works for plain arrays and the BitPlanes of compact boards alike
+    def take(grid):
+        return np.asarray(grid) if i is None else np.asarray(grid[i, j])
+
+    cells = take(board.cells).astype(int)
+    excavated = take(board.excavated)
+    flags = take(board.flags)
+
+    shown = COUNT + np.clip(cells, 0, None)
+    shown = np.where(cells == -1, np.where(excavated, EXPLODED, MINE), shown)
+
+    # JerkBoard hides the counts of fogged cells
+    fogged = getattr(board, 'fogged', None)
+    if fogged is not None:
+        shown = np.where(take(fogged) & excavated, FOG, shown)
+
+    index = np.where(excavated | reveal, shown, COVERED)
+    return np.where(flags & ~excavated, FLAG, index).astype(np.int8)
+
+
+
+
+class RasterRenderer():
+    """ Draws a board as one image on ax.
+            renderer.paint(reveal=False)
+                Rebuilds the whole image from the board state.  With
+                reveal=True every cell is shown, as in Board._reveal_board()
+            renderer.update(cells)
+                Redraws only the listed (i, j) cells
+            renderer.image
+                The imshow artist.  Its data is updated in place
+
+        Cell (i, j) sits at x = i, y = j like in the patch renderer, so mouse
+        clicks map to the same cells.  tile is the size of a cell in image
+        pixels.  Matching it to the size of a cell on screen keeps matplotlib
+        from resampling the image much on every draw
+    """
+
+    def __init__(self, board, ax, tile=16):
+        self.board = board
+        self.tile = tile
+        self.tiles = glyph_tiles(tile)
+
+        dim = board.dim
+        self.pixels = np.zeros((dim * tile, dim * tile, 4), dtype=np.uint8)
+        self.image = ax.imshow(self.pixels, origin='lower', extent=(0, dim, 0, dim),
+                               interpolation='nearest')
+
+
+
+    def paint(self, reveal=False):
+        """ Rebuilds the whole image in one pass over the board
+        """
+        dim, t = self.board.dim, self.tile
+
+        # index[i, j] -> tiles of shape (dim_i, dim_j, t_y, t_x, 4).  Image
+        #  rows run along y (j) and columns along x (i)
+        blocks = self.tiles[cell_states(self.board, reveal=reveal)]
+        self.pixels[:] = blocks.transpose(1, 2, 0, 3, 4).reshape(dim * t, dim * t, 4)
+        self.image.set_data(self.pixels)
+
+
+
+    def update(self, cells):
+        """ Redraws the tiles of the (i, j) cells listed
+        """
+        cells = np.asarray(list(cells), dtype=int).reshape(-1, 2)
+        if not len(cells):
+            return
+
+        t = self.tile
+        i, j = cells[:, 0], cells[:, 1]
+        blocks = self.tiles[cell_states(self.board, i, j)]
+
+        # Pixel rows and columns of each cell's tile
+        rows = j[:, None] * t + np.arange(t)
+        cols = i[:, None] * t + np.arange(t)
+        self.pixels[rows[:, :, None], cols[:, None, :]] = blocks
+        self.image.set_data(self.pixels)
@@ -0,0 +1,201 @@
+""" Records games played on a Board or JerkBoard to an animated GIF or MP4.
+
+    The agent's thread only collects the cells changed since its last step
+    and queues them as a small (n, 3) array of (i, j, tile index).  A
+    background process applies the deltas to its own copy of the board,
+    assembles each frame from the raster glyph tiles and encodes it.  It is a
+    process rather than a thread so encoding never holds the agent's GIL, and
+    the agent keeps close to headless speed while recording.
+"""
+import os
+import shutil
+import subprocess
+import multiprocessing
+import numpy as np
+from raster import glyph_tiles, cell_states
+
+
+
+
+class Recorder():
+    """ Records one frame per agent step.
+
+            recorder = Recorder(board, 'game.gif', fps=10)
+            agent.solve(recorder=recorder)
+            recorder.close()
+
+        or as a context manager.  recorder.capture() queues the current step.
+        The agents' solve() loops call it once per iteration.
+
+        The file type follows the extension of path.  '.gif' is encoded with
+        Pillow, anything else ('.mp4') is piped to ffmpeg, which must be on
+        the PATH.  tile is the size of a cell in pixels.  close() raises a
+        RuntimeError if the encoder failed
+    """
+
+    def __init__(self, board, path, fps=10, tile=16):
+        self.board = board
+        self.path = path
+        self.fps = fps
+        self.tile = tile
+
+        # Every change of the board since the last capture
+        self._events = board.events()
+
+        if not str(path).lower().endswith('.gif') and shutil.which('ffmpeg') is None:
+            raise ValueError("ffmpeg is needed to write {}".format(path))
+
+        # Deltas for the encoder.  ('key', states) replaces the whole board,
+        #  ('delta', (n, 3) array) changes single cells, None stops it
+        self._queue = multiprocessing.Queue()
+        self._queue.put(('key', cell_states(board)))
+
+        self._process = multiprocessing.Process(target=_encode,
+                                                args=(self._queue, str(path), tile, fps),
+                                                daemon=True)
+        self._process.start()
+
+
+
+    def capture(self):
+        """ Queues a frame with every cell changed since the last capture.
+            Nothing is queued when the board did not change
+        """
+        events = list(self._events)
+
+        # A new game on the same board.  Send it whole
+        if any(event.kind == 'reset' for event in events):
+            self._queue.put(('key', cell_states(self.board)))
+            return
+
+        changed = {(event.i, event.j) for event in events if event.i is not None}
+        if not changed:
+            return
+
+        i, j = np.array(sorted(changed), dtype=int).T
+        self._queue.put(('delta', np.column_stack([i, j, cell_states(self.board, i, j)])))
+
+
+
+    def close(self):
+        """ Waits for the queued frames to be encoded and finishes the file
+        """
+        if self._process is None:
+            return
+
+        self._events.close()
+        self._queue.put(None)
+        self._process.join()
+        exitcode = self._process.exitcode
+        self._process = None
+
+        if exitcode != 0:
+            raise RuntimeError("Encoding {} failed.  See the encoder's traceback above".format(self.path))
+
+
+
+    def __enter__(self):
+        return self
+
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+
+
+def _states(queue):
+    """ Yields the (dim, dim) tile index grid of every queued frame, in
+        order, until the recorder is closed
+    """
+    states = None
+    while True:
+        item = queue.get()
+        if item is None:
+            return
+
+        kind, data = item
+        if kind == 'key':
+            states = data.copy()
+        else:
+            states[data[:, 0], data[:, 1]] = data[:, 2]
+        yield states
+
+
+
+def _frame(tiles, states):
+    """ Assembles the tiles of a frame into one image.  Flipped so that j
+        grows upwards, as on the board's figure
+    """
+    dim, t = states.shape[0], tiles.shape[1]
+    blocks = tiles[states].swapaxes(0, 1)
+    image = blocks.swapaxes(1, 2).reshape((dim * t, dim * t) + tiles.shape[3:])
+    return np.ascontiguousarray(image[::-1])
+
+
+
+def _encode(queue, path, tile, fps):
+    """ Entry point of the encoder process.  It runs at a lower priority so
+        that on a busy machine the agent gets the CPU first
+    """
+    if hasattr(os, 'nice'):
+        os.nice(10)
+
+    if path.lower().endswith('.gif'):
+        _write_gif(queue, path, tile, fps)
+    else:
+        _write_ffmpeg(queue, path, tile, fps)
+
+
+
+def _write_gif(queue, path, tile, fps):
+    from PIL import Image
+
+    # Quantize the tile stack once.  Frames are then built straight from
+    #  palette indices, without quantizing each frame
+    rgb = glyph_tiles(tile)[..., :3]
+    count = rgb.shape[0]
+    quantized = Image.fromarray(rgb.reshape(-1, tile, 3)).quantize(256)
+    tiles = np.asarray(quantized).reshape(count, tile, tile)
+    palette = quantized.getpalette()
+
+    def images():
+        for states in _states(queue):
+            image = Image.fromarray(_frame(tiles, states))
+            image.putpalette(palette)
+            yield image
+
+    frames = images()
+    first = next(frames, None)
+    if first is None:
+        return
+
+    # Pillow pulls the remaining frames from the generator as it writes
+    first.save(path, save_all=True, append_images=frames,
+               duration=int(1000 / fps), loop=0)
+
+
+
+def _write_ffmpeg(queue, path, tile, fps):
+    tiles = np.ascontiguousarray(glyph_tiles(tile)[..., :3])
+    frames = _states(queue)
+
+    # The frame size is only known once the first frame arrives
+    states = next(frames, None)
+    if states is None:
+        return
+    size = states.shape[0] * tile
+
+    ffmpeg = subprocess.Popen(['ffmpeg', '-y', '-loglevel', 'error',
+                               '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+                               '-s', '{0}x{0}'.format(size), '-r', str(fps),
+                               '-i', '-', '-pix_fmt', 'yuv420p', path],
+                              stdin=subprocess.PIPE)
+    try:
+        ffmpeg.stdin.write(_frame(tiles, states).tobytes())
+        for states in frames:
+            ffmpeg.stdin.write(_frame(tiles, states).tobytes())
+    finally:
+        ffmpeg.stdin.close()
+        ffmpeg.wait()
@@ -0,0 +1,273 @@
+""" Compact binary logs of single games, and a replayer for them.
+
+    GameLog listens to the change events of a Board or JerkBoard (see
+    events.py) and writes every move to a small binary log.  replay() plays a
+    log back on a new headless board, with batched board calls and without
+    running any agent:
+
+        log = GameLog(board)
+        agent.solve()
+        log.save('game.msrl')
+
+        board = replay('game.msrl')              final state of the game
+        board = replay('game.msrl', upto=120)    state after the first 120 moves
+
+    A log is the header followed by one varint per move:
+
+        b'MSRL' <u1 version>
+        varint dim, varint num_mines, <u1 bits: 1 JerkBoard, 2 torus, 4 seed,
+                                        8 compact>
+        <f8 fog_probability>                      JerkBoard only
+        varint seed  or  packbits(mines)          seed when the log was given
+                                                  an int seed, layout otherwise
+        varint cell * 16 + code                   per move, cell = i * dim + j
+
+    code 0 to 10 is an excavation that returned code - 2 (-2 fog, -1 mine or
+    the mine count), FLAG_ON and FLAG_OFF a flag toggle and HIDE an
+    excavation undone by restore().  Moves on a 30x30 board take 2 bytes.
+    Cascades are logged cell by cell, in the order the board revealed them.
+"""
+import struct
+import numpy as np
+from board import Board
+from jerk_board import JerkBoard
+
+
+magic = b'MSRL'
+version = 1
+
+# Move codes above the excavation results
+FLAG_ON, FLAG_OFF, HIDE = 11, 12, 13
+
+# Header bits
+_JERK, _TORUS, _SEED, _COMPACT = 1, 2, 4, 8
+
+
+
+
+class GameLog():
+    """ Logs the moves of one game of board, from the moment it is created.
+
+        Create it before the first move.  seed is the int the board was
+        seeded with, if any.  The log then stores it instead of the layout.
+        reset() on the board ends the log, as does close()
+    """
+
+    def __init__(self, board, seed=None):
+        visible, _, flags = board.observation()
+        if np.any(visible != board.hidden_value) or np.any(flags):
+            raise ValueError("GameLog must be created before the first move")
+
+        self.dim = board.dim
+        jerk = isinstance(board, JerkBoard)
+        bits = (_JERK if jerk else 0) | (_TORUS if board.torus else 0) | \
+               (_SEED if seed is not None else 0) | (_COMPACT if board.compact else 0)
+
+        self._data = bytearray(magic)
+        self._data.append(version)
+        _put_varint(self._data, board.dim)
+        _put_varint(self._data, board.num_mines)
+        self._data.append(bits)
+        if jerk:
+            self._data += struct.pack('<d', board.fog_probability)
+        if seed is not None:
+            _put_varint(self._data, int(seed))
+        else:
+            self._data += np.packbits(np.asarray(board.cells) == -1).tobytes()
+
+        self._unsubscribe = board.subscribe(self._record)
+
+
+
+    def _record(self, event):
+        kind = event.kind
+        if kind == 'reveal' or kind == 'fog':
+            code = event.value + 2
+        elif kind == 'flag':
+            code = FLAG_ON if event.value else FLAG_OFF
+        elif kind == 'hide':
+            code = HIDE
+        else:
+            if kind == 'reset':
+                self.close()
+            return
+
+        _put_varint(self._data, (event.i * self.dim + event.j) * 16 + code)
+
+
+
+    @property
+    def nbytes(self):
+        return len(self._data)
+
+
+
+    def getvalue(self):
+        """ Returns the log as bytes
+        """
+        return bytes(self._data)
+
+
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self._data)
+
+
+
+    def close(self):
+        """ Stops logging.  The log keeps what was recorded so far
+        """
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+
+
+
+
+def load(log):
+    """ Parses a log (bytes or a path).  Returns (header, moves).
+
+        header is a dict of dim, num_mines, fog_probability (None on Board),
+        torus, compact, seed and mines (one of the two is None).  moves is an (n, 4)
+        int array of (code, i, j, result).  result is what an excavation
+        returned, 0 for flag toggles and hides
+    """
+    if not isinstance(log, (bytes, bytearray, memoryview)):
+        with open(log, 'rb') as f:
+            log = f.read()
+    data = memoryview(log)
+
+    if bytes(data[:4]) != magic:
+        raise ValueError("Not a game log")
+    if data[4] != version:
+        raise ValueError("Unsupported game log version {}".format(data[4]))
+
+    pos = 5
+    dim, pos = _get_varint(data, pos)
+    num_mines, pos = _get_varint(data, pos)
+    bits = data[pos]
+    pos += 1
+
+    fog_probability = None
+    if bits & _JERK:
+        fog_probability, = struct.unpack_from('<d', data, pos)
+        pos += 8
+
+    seed = mines = None
+    if bits & _SEED:
+        seed, pos = _get_varint(data, pos)
+    else:
+        size = (dim * dim + 7) // 8
+        packed = np.frombuffer(data[pos:pos + size], dtype=np.uint8)
+        mines = np.unpackbits(packed, count=dim * dim).astype(bool).reshape(dim, dim)
+        pos += size
+
+    header = dict(dim=dim, num_mines=num_mines, fog_probability=fog_probability,
+                  torus=bool(bits & _TORUS), compact=bool(bits & _COMPACT),
+                  seed=seed, mines=mines)
+
+    keys = _decode_varints(data[pos:])
+    cell, code = np.divmod(keys, 16)
+    i, j = np.divmod(cell, dim)
+    result = np.where(code <= 10, code - 2, 0)
+    return header, np.stack([code, i, j, result], axis=1)
+
+
+
+def replay(log, upto=None):
+    """ Plays the first upto moves of a log (all of them by default) on a new
+        headless board and returns it.
+
+        Runs of excavations go to the board as one user_select_many() call
+        and runs of flag toggles as one user_flag_many() call.  A ValueError
+        is raised if the board returns a different value than the log holds
+    """
+    header, moves = load(log)
+    moves = moves[:upto]
+
+    kwargs = dict(headless=True, torus=header['torus'], compact=header['compact'])
+    if header['seed'] is not None:
+        kwargs['rng'] = header['seed']
+    else:
+        kwargs['mines'] = header['mines']
+
+    if header['fog_probability'] is None:
+        board = Board(header['dim'], header['num_mines'], **kwargs)
+    else:
+        board = JerkBoard(header['dim'], header['num_mines'], header['fog_probability'],
+                          **kwargs)
+
+        # Without the seed the fog rolls are lost.  The log says which cells
+        #  were fogged, so roll those under the probability and the rest over
+        if header['seed'] is None:
+            fogged = np.zeros(board.fog_rolls.shape, dtype=bool)
+            fog = moves[:, 3] == -2
+            fogged[moves[fog, 1], moves[fog, 2]] = True
+            board.fog_rolls[:] = np.where(fogged, -1., 2.)
+
+    # Runs of moves of the same kind: excavations, flag toggles, hides
+    kind = np.select([moves[:, 0] <= 10, moves[:, 0] == HIDE], [0, 2], 1)
+    starts = np.flatnonzero(np.diff(kind, prepend=-1))
+    stops = np.append(starts[1:], len(moves))
+
+    for start, stop in zip(starts, stops):
+        run = moves[start:stop]
+
+        if kind[start] == 0:
+            values = board.user_select_many(run[:, 1:3])
+            if np.any(values != run[:, 3]):
+                k = start + int(np.argmax(values != run[:, 3]))
+                raise ValueError("Move {} does not match the board".format(k))
+        elif kind[start] == 1:
+            board.user_flag_many(run[:, 1:3])
+        else:
+            for _, i, j, _ in run:
+                board._hide(i, j)
+
+    board.check_gameover_conditions()
+    return board
+
+
+
+
+def _put_varint(out, value):
+    """ Appends value to the bytearray out as an unsigned LEB128 varint
+    """
+    while value >= 0x80:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+
+def _get_varint(data, pos):
+    """ Reads one varint from data at pos.  Returns (value, next pos)
+    """
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if byte < 0x80:
+            return value, pos
+
+
+
+def _decode_varints(data):
+    """ Decodes a run of varints at once.  Returns an int64 array
+    """
+    b = np.frombuffer(data, dtype=np.uint8)
+    if not len(b):
+        # A game saved before its first move
+        return np.zeros(0, np.int64)
+
+    ends = np.flatnonzero(b < 0x80)
+    if not len(ends) or ends[-1] != len(b) - 1:
+        raise ValueError("Game log is truncated")
+
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    digit = np.arange(len(b)) - np.repeat(starts, ends - starts + 1)
+    values = (b & 0x7f).astype(np.int64) << (7 * digit)
+    return np.add.reduceat(values, starts)
@@ -0,0 +1,57 @@
+""" Random number plumbing shared by the boards, the agents and analysis.
+
+    Every board and agent takes rng=None: a seed, a SeedSequence or an
+    np.random.Generator.  Each keeps its own Generator, so games running side
+    by side never share a stream and any game can be replayed from its seed.
+"""
+import numpy as np
+
+
+
+def as_generator(rng=None):
+    """ Returns an np.random.Generator for rng.  A Generator is used as is,
+        anything else seeds a new one.
+
+        rng=None draws the seed from the legacy global state, so code that
+        calls np.random.seed() first still gets repeatable games
+    """
+    if isinstance(rng, np.random.Generator):
+        return rng
+
+    if rng is None:
+        rng = int(np.random.randint(2**63 - 1, dtype=np.int64))
+
+    return np.random.default_rng(rng)
+
+
+
+def as_seed(rng=None):
+    """ Returns an int seed for rng, for code that has to hand a seed on
+        instead of a Generator: a game in another process, or generators
+        rebuilt from a base seed.  An int is returned as is.  Anything else
+        gives the first draw of as_generator(rng), so rng=None follows
+        np.random.seed() here too
+    """
+    if isinstance(rng, (int, np.integer)):
+        return int(rng)
+
+    return int(as_generator(rng).integers(2**63 - 1))
+
+
+
+def spawn(seed, n):
+    """ Returns n independent SeedSequences derived from seed.  seed=None
+        draws it from the legacy global state, like as_generator().
+
+        Unlike SeedSequence.spawn(), a SeedSequence seed is not advanced: the
+        same seed always gives the same n children, whether it was used
+        before or arrived as a fresh copy in a worker process
+    """
+    if not isinstance(seed, np.random.SeedSequence):
+        if seed is None:
+            seed = int(np.random.randint(2**63 - 1, dtype=np.int64))
+        return np.random.SeedSequence(seed).spawn(n)
+
+    return [np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key + (k,),
+                                   pool_size=seed.pool_size)
+            for k in range(n)]
@@ -1,51 +1,29 @@
 import numpy as np 
+from seeding import as_generator
+from neighbor_table import neighbor_table
+from agent_state import new_state, CellGrid, UNSAFE, SAFE 
 from time import sleep 
 from .utils import Variable, Clause, CellClauses, KnowledgeBase, neighbors
 
 
-class Cell(): 
-    covered = True 
-    mine = None 
-    mine_count = None 
-    flag = None 
-    safe = None 
-
-    def __str__(self):
-        
-        if self.flag: 
-            return "F"
-
-        if self.covered: 
-            return "?"
-
-        if self.mine_count is not None: 
-            return str(self.mine_count)
-        
-        if self.mine: 
-            return 'M' 
-
-        else: 
-            return "err"
-
-    def __repr__(self): 
-        return self.__str__() 
-
-
-
 class SmartypantsAgent(): 
 
 
-    def __init__(self, board): 
+    def __init__(self, board, rng=None): 
 
         # Environment/board attribute of agent.  
         self._board = board 
         #   The only allowed interfaces to this object are: 
-        #       .user_select(i, j)
+        #       .user_select(i, j, cascade=False)
         #       .user_flag(i, j)
+        #       .user_select_many(coords, cascade=False)
+        #       .user_flag_many(coords)
+        #       .observation()  (read-only visible, excavated and flag grids)
         #       .check_gameover_conditions()
         #       .score 
         #       .dim 
         #       .num_mines 
+        #       .torus 
         #   Other attribute or functions accesses are illegal and cheating  
         #    e.g The agent cannot access board.cells or board.excavated   
 
@@ -54,6 +32,13 @@ class SmartypantsAgent():
         self.dim = self._board.dim 
         self.num_mines = self._board.num_mines 
 
+        # Neighbors of every cell, shared with the board.  See neighbor_table.py 
+        self.neighbors = neighbor_table(self.dim, self._board.torus)
+
+        # Agent's own random generator for random clicks.  A seed or an 
+        #  np.random.Generator.  See seeding.py 
+        self.rng = as_generator(rng)
+
 
         # Initialize a knowledgebase object for each cell.  
         self.kb = np.zeros((self.dim, self.dim), dtype=CellClauses)
@@ -66,12 +51,10 @@ class SmartypantsAgent():
 
 
 
-        # Initialize agent's internal knowlege of cells. 
-        #   This is the same as that used in the basic agent 
-        self.cells = np.zeros((self.dim, self.dim), dtype=Cell)
-        for i in range(self.dim): 
-            for j in range(self.dim): 
-                self.cells[i, j] = Cell() 
+        # Initialize agent's internal knowlege of cells, one array per cell 
+        #  attribute.  This is the same as that used in the basic agent 
+        self.covered, self.flag, self.safe, self.mine_count = new_state(self.dim)
+        self.cells = CellGrid(self)
 
 
         # Metric for counting random clicks 
@@ -87,17 +70,52 @@ class SmartypantsAgent():
         """
 
         # If flagged, cannot excavate 
-        if self.cells[i, j].flag: 
+        if self.flag[i, j]: 
             return False 
 
-        value = self._board.user_select(i, j)
-        self.cells[i, j].covered = False    
+        # Zero cells cascade on the board.  Learn from every revealed cell 
+        for (r, c, value) in self._board.user_select(i, j, cascade=True): 
+            self.update_excavated_cell(r, c, value, log=log)
+
+        return True 
+
+
+
+    def excavate_cells(self, coords, log=False): 
+        """ Agent digs up every cell in coords with a single user_select_many() 
+        call to the board, then updates internal data structs for every cell 
+        revealed, including those opened by the zero cascade.
+
+        Returns true if any cell was excavated 
+        """
+
+        # Flagged cells cannot be excavated 
+        coords = [(i, j) for (i, j) in coords if not self.flag[i, j]]
+        if not coords: 
+            return False 
+
+        revealed = self._board.user_select_many(coords, cascade=True)
+        for (r, c, value) in revealed: 
+            self.update_excavated_cell(r, c, value, log=log)
+
+        return True 
+
+
+
+    def update_excavated_cell(self, i, j, value, log=False): 
+        """ Updates internal data structs with the value returned by the board 
+        for excavating (i, j).
+
+        Returns true 
+        """
+
+        self.covered[i, j] = False 
+        self.mine_count[i, j] = value 
 
 
         # Hit a mine 
         if value == -1: 
-            self.cells[i, j].mine = True 
-            self.cells[i, j].safe = False 
+            self.safe[i, j] = UNSAFE 
             if log: print("Excavated a mine at ({}, {})".format(i, j))
 
             # update knowledgebase
@@ -118,14 +136,13 @@ class SmartypantsAgent():
         else: 
         # Did not hit a mine.  Got a mine_count (stored in value) 
 
-            self.cells[i, j].mine_count = value 
-            self.cells[i, j].safe = True 
+            self.safe[i, j] = SAFE 
             if log: print("Excavated ({}, {})".format(i, j))
 
             # Update knowledgebase 
 
             # Add information to knowledgebase regarding the mine_count 
-            added = self.kb[i, j].generate_clauses_from_minecount(i, j, value, self.dim)
+            added = self.kb[i, j].generate_clauses_from_minecount(i, j, value, self.dim, self.neighbors.torus)
             if log: print("Added {} clauses to KB for cell ({}, {})".format(added, i, j))
 
 
@@ -152,16 +169,35 @@ class SmartypantsAgent():
 
 
         self._board.user_flag(i, j)
+        self.update_flagged_cell(i, j, log=log)
+
+
+
+    def toggle_flags(self, coords, log=False): 
+        """ Toggles flags on every cell in coords with a single user_flag_many() 
+        call to the board, then updates internal structures cell by cell.
+        """
+
+        self._board.user_flag_many(coords)
+        for (i, j) in coords: 
+            self.update_flagged_cell(i, j, log=log)
+
+
+
+    def update_flagged_cell(self, i, j, log=False): 
+        """ Updates internal structures after the flag on (i, j) was toggled 
+        """
+
         if log: print("Toggled flag at ({}, {})".format(i, j))
 
         # Flag was already present
-        if self.cells[i, j].flag: 
-            self.cells[i, j].flag = False 
+        if self.flag[i, j]: 
+            self.flag[i, j] = False 
             # update knowledge base? TODO 
 
         # Flag wasnt present 
         else: 
-            self.cells[i, j].flag = True 
+            self.flag[i, j] = True 
             
             # Update knowledgebase.
             #  Cell at (i, j) is deemed a mine. 
@@ -203,14 +239,14 @@ class SmartypantsAgent():
                             r = literal.i
                             c = literal.j
 
-                            self.cells[r, c].safe = False 
+                            self.safe[r, c] = UNSAFE 
 
                         else: 
                             # Literal's cell is not a mine                             
                             r = literal.i
                             c = literal.j
 
-                            self.cells[r, c].safe = True 
+                            self.safe[r, c] = SAFE 
 
                     if log: print("Learned from clauses at ({}, {})".format(i, j))
                     # Remove the clause when done
@@ -221,43 +257,31 @@ class SmartypantsAgent():
 
 
     def uncover_all_safe_cells(self, log=False): 
-        """ Loop through all cells on the board and excavate any covered 
-           cell marked safe
+        """ Excavate every covered cell marked safe
 
-           Returns True if any of the excavate_cell calls was successful 
+           Returns True if any cell was excavated 
         """
 
-        success = False 
+        coords = np.argwhere(self.covered & (self.safe == SAFE))
 
-        for i in range(self.dim): 
-            for j in range(self.dim): 
-
-                if self.cells[i, j].covered and self.cells[i, j].safe: 
-                    ret = self.excavate_cell(i, j, log) 
-                    if ret: 
-                        success = True 
-
-        return success 
+        # Excavate them all in one batch 
+        return self.excavate_cells(coords.tolist(), log) 
 
 
 
     def mark_all_mine_cells(self, log=False): 
-        """ Loop through all the cells on the board and flag any covered cells 
-            marked as not safe.  
+        """ Flag every covered, unflagged cell marked as not safe.  
 
-            Returns True if any of the toggle_flag calls was successful 
+            Returns True if any flag was placed 
         """
 
-        success = False 
-
-        for i in range(self.dim): 
-            for j in range(self.dim): 
+        coords = np.argwhere(self.covered & (self.safe == UNSAFE) & ~self.flag)
 
-                if self.cells[i, j].covered and (self.cells[i, j].safe == False) and (not self.cells[i, j].flag):
-                    self.toggle_flag(i, j, log)
-                    success = True 
+        # Flag them all in one batch 
+        if len(coords): 
+            self.toggle_flags(coords.tolist(), log)
 
-        return success
+        return len(coords) > 0 
 
 
 
@@ -268,50 +292,51 @@ class SmartypantsAgent():
 
         success = False 
 
-        for i in range(self.dim):
-            for j in range(self.dim): 
+        mines = self.covered & self.flag 
+        safe = ~self.covered & (self.safe == SAFE)
 
+        for (i, j) in np.argwhere(mines | safe).tolist(): 
 
-                # Covered and Flagged --> mine 
-                if self.cells[i, j].covered and self.cells[i, j].flag: 
-                    # Update knowledgebase. Cell at (i, j) is deemed a mine. 
-                    #  Loop through all clauses in knowledgebase 
-                    #    if conflicting literal exists in clause, remove clause 
-                    #    conflicting literal is (-M(i, j))
+            # Covered and Flagged --> mine 
+            if mines[i, j]: 
+                # Update knowledgebase. Cell at (i, j) is deemed a mine. 
+                #  Loop through all clauses in knowledgebase 
+                #    if conflicting literal exists in clause, remove clause 
+                #    conflicting literal is (-M(i, j))
 
-                    total_removed = 0 
-                    for i_ in range(self.dim): 
-                        for j_ in range(self.dim): 
-                            removed = self.kb[i_, j_].remove_mine_variable(i, j)
-                            if removed: 
-                                total_removed += removed
-                                success = True 
+                total_removed = 0 
+                for i_ in range(self.dim): 
+                    for j_ in range(self.dim): 
+                        removed = self.kb[i_, j_].remove_mine_variable(i, j)
+                        if removed: 
+                            total_removed += removed
+                            success = True 
 
-                    if log: print("Removed {} clauses with -M({}, {})".format(total_removed, i, j))
+                if log: print("Removed {} clauses with -M({}, {})".format(total_removed, i, j))
 
-                # Uncovered and safe --> not mine 
-                if self.cells[i, j].covered == False and self.cells[i, j].safe: 
+            # Uncovered and safe --> not mine 
+            if safe[i, j]: 
 
 
-                    # Update knowledgebase 
-                    #  DOnt need to add to KB.  This is done on excavating and flagging
-                    # # Add information to knowledgebase regarding the mine_count 
-                    # value = self.cells[i, j].mine_count
-                    # added = self.kb[i, j].generate_clauses_from_minecount(i, j, value, self.dim)
-                    # if log: print("Added {} clauses to KB for cell ({}, {})".format(added, i, j))
+                # Update knowledgebase 
+                #  DOnt need to add to KB.  This is done on excavating and flagging
+                # # Add information to knowledgebase regarding the mine_count 
+                # value = self.mine_count[i, j]
+                # added = self.kb[i, j].generate_clauses_from_minecount(i, j, value, self.dim, self.neighbors.torus)
+                # if log: print("Added {} clauses to KB for cell ({}, {})".format(added, i, j))
 
 
-                    #  Loop through all clauses in the knowledgebase 
-                    #    if conflicting literal exists in clause, remove clause 
-                    #    conflicting literal is (M(i, j))
-                    total_removed = 0
-                    for i_ in range(self.dim): 
-                        for j_ in range(self.dim): 
-                            removed = self.kb[i_, j_].remove_safe_variable(i, j)
-                            if removed: 
-                                total_removed += removed
-                                success = True 
-                    if log: print("Removing {} clauses with M({}, {})".format(total_removed, i, j))
+                #  Loop through all clauses in the knowledgebase 
+                #    if conflicting literal exists in clause, remove clause 
+                #    conflicting literal is (M(i, j))
+                total_removed = 0
+                for i_ in range(self.dim): 
+                    for j_ in range(self.dim): 
+                        removed = self.kb[i_, j_].remove_safe_variable(i, j)
+                        if removed: 
+                            total_removed += removed
+                            success = True 
+                if log: print("Removing {} clauses with M({}, {})".format(total_removed, i, j))
 
 
 
@@ -320,7 +345,7 @@ class SmartypantsAgent():
 
 
 
-    def solve(self, interactive=False, log=False, delay=0):
+    def solve(self, interactive=False, log=False, delay=0, recorder=None):
 
         self.excavate_cell(0, 0, log=log)
 
@@ -336,29 +361,29 @@ class SmartypantsAgent():
             refresh = self.refresh_knowledgebase(log=log)
 
 
+            # Queue this step's changes for the recorder (see recorder.py) 
+            if recorder is not None: 
+                recorder.capture()
+
             if (self._board.check_gameover_conditions()):
                 return self._board.score
 
 
             # If nothing was accomplished on this iteration, reveal some 
-            #   random cell.             
+            #   random covered cell.             
             if not learned and not uncover and not mark and not refresh: 
-                done = False 
-                while (not done): 
+                i, j = divmod(int(self.rng.choice(np.flatnonzero(self.covered))), self.dim)
+                if log: print("\tRandomly selected ({}, {}) to uncover.".format(i, j))
+                self.excavate_cell(i, j) 
+                self.random_clicks += 1
 
-                    i, j = np.random.randint(0, self.dim, size=2)
-                    if self.cells[i, j].covered: 
-                        if log: print("\tRandomly selected ({}, {}) to uncover.".format(i, j))
-                        self.excavate_cell(i, j) 
-                        self.random_clicks += 1
-                        done = True 
 
 
-
-            self._board.fig.canvas.draw()
-
-            # delay so that we can watch on the GUI 
-            sleep(delay) 
+            # Draw and delay so that we can watch on the GUI.  Skipped when
+            #  the board has no figure (headless or closed) 
+            if self._board.fig is not None: 
+                self._board.draw()
+                sleep(delay) 
 
 
         return self._board.score
@@ -379,18 +404,14 @@ class SmartypantsAgent():
 
 
         # If nothing was accomplished on this iteration, reveal some 
-        #   random cell.             
+        #   random covered cell.             
         if not learned and not uncover and not mark and not refresh: 
-            done = False 
-            while (not done): 
-
-                i, j = np.random.randint(0, self.dim, size=2)
-                if self.cells[i, j].covered: 
-                    if log: print("\tRandomly selected ({}, {}) to uncover.".format(i, j))
-                    self.excavate_cell(i, j) 
-                    done = True 
+            i, j = divmod(int(self.rng.choice(np.flatnonzero(self.covered))), self.dim)
+            if log: print("\tRandomly selected ({}, {}) to uncover.".format(i, j))
+            self.excavate_cell(i, j) 
 
 
 
-        self._board.fig.canvas.draw()
+        if self._board.fig is not None: 
+            self._board.draw()
 
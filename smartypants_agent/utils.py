@@ -1,5 +1,6 @@
 import numpy as np
 import itertools
+from neighbor_table import neighbor_table
 
 
 
@@ -123,10 +124,10 @@ class CellClauses():
     
     
     
-    def generate_clauses_from_minecount(self, i, j, mine_count, dim): 
+    def generate_clauses_from_minecount(self, i, j, mine_count, dim, torus=False): 
       
         src_bools = list()
-        neighs = neighbors(i, j, dim)
+        neighs = neighbors(i, j, dim, torus)
 
 
         for dummy in range(len(neighs)):
@@ -257,19 +258,10 @@ class KnowledgeBase():
         
 
 
-def neighbors(i, j, dim): 
-    
-    neighbors = [(i+1, j+1), (i+1, j), (i, j+1), (i-1, j+1), \
-             (i-1, j-1), (i-1, j), (i, j-1), (i+1, j-1)]
-
-    out = []
-    
-    for neighbor in neighbors: 
-        # The neighbor is within bounds of the board 
-        if (0 <= neighbor[0] < dim) and (0 <= neighbor[1] < dim): 
-            out.append(neighbor) 
-            
-    return out 
+def neighbors(i, j, dim, torus=False): 
+    """ Returns the neighbors of (i, j) as a tuple of (r, c).  See neighbor_table.py 
+    """
+    return neighbor_table(dim, torus).of(i, j)
 
     
     
\ No newline at end of file
@@ -0,0 +1,68 @@
+""" Cold import time of the modules a worker process loads.
+
+    Each module is imported in a fresh interpreter, the way a process-pool
+    worker starts, and the best of --repeat runs is reported.  import is the
+    time spent in the import statement alone, process the whole life of the
+    interpreter from spawn to exit:
+
+        python startup_bench.py
+        python startup_bench.py board analysis --repeat 10
+"""
+import os
+import sys
+import argparse
+import subprocess
+from time import perf_counter
+
+
+# Modules timed when none are named, in dependency order
+modules = ('seeding', 'events', 'bitplane', 'neighbor_table', 'journal', 'agent_state',
+           'corpus', 'board', 'jerk_board', 'batch_board', 'chunked_board', 'basic_agent',
+           'smartypants_agent', 'cnf_agent', 'cnf_bonus_agent', 'cnf_total_agent',
+           'vec_env', 'replay', 'no_guess', 'board_server', 'raster', 'recorder', 'analysis')
+
+_timer = "from time import perf_counter; t = perf_counter(); import {}; print(perf_counter() - t)"
+
+
+
+
+def import_time(module, repeat=5):
+    """ Returns the best (import, process) times of module over repeat fresh
+        interpreters, in seconds
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    best = (float('inf'), float('inf'))
+    for _ in range(repeat):
+        start = perf_counter()
+        out = subprocess.run([sys.executable, '-c', _timer.format(module)], cwd=here,
+                             capture_output=True, text=True, check=True).stdout
+        process = perf_counter() - start
+        best = min(best[0], float(out)), min(best[1], process)
+
+    return best
+
+
+
+def report(names=modules, repeat=5):
+    """ Prints the import and process time of every module in names.  The
+        first row is a bare interpreter, the floor every worker pays
+    """
+    rows = [('(interpreter)', (0.0, import_time('sys', repeat)[1]))]
+    rows += [(name, import_time(name, repeat)) for name in names]
+
+    width = max(len(name) for name, _ in rows)
+    print("{:<{w}}  {:>10}  {:>10}".format('module', 'import ms', 'process ms', w=width))
+    for name, (imp, process) in rows:
+        print("{:<{w}}  {:>10.1f}  {:>10.1f}".format(name, imp * 1e3, process * 1e3, w=width))
+
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Report the cold import time of each module")
+    parser.add_argument('modules', nargs='*', default=list(modules))
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    report(args.modules, repeat=args.repeat)
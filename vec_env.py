@@ -0,0 +1,201 @@
+""" Gym-style vectorized environment for training policies on many games.
+
+    VecMinesweeperEnv plays N games of the same size in lockstep on a
+    BatchBoard.  Every step takes one action per game and is carried out
+    with array operations over all games, zero cascades and fog included:
+
+        env = VecMinesweeperEnv(256, dim=10, num_mines=15, rng=0)
+        obs = env.reset()
+        while training:
+            obs, reward, done, info = env.step(policy(obs))
+
+    An action is a flat index into 2 * dim * dim choices.  a < dim * dim
+    selects cell divmod(a, dim), a >= dim * dim toggles the flag on cell
+    divmod(a - dim * dim, dim).  Selecting an excavated or flagged cell and
+    flagging an excavated one do nothing.
+
+    Observations are (N, 3, dim, dim) int8 arrays.  Channel VISIBLE holds
+    what Board.observation() calls visible: the value the board returned for
+    each excavated cell (-1 mine, -2 fog, mine count) and hidden_value where
+    the cell is covered.  Channels EXCAVATED and FLAGS are 0/1 masks.
+
+    The reward is the change in (correct flags - incorrect flags) / num_mines,
+    so the rewards of a game add up to its Board score.  A game is done when
+    every cell is excavated or flagged, or after max_steps steps.  Finished
+    games are reset in the same step.  info['final_observation'] holds their
+    last observation, in the order of np.nonzero(done).
+"""
+import numpy as np
+from batch_board import BatchBoard, neighbor_sum
+from seeding import as_generator
+
+
+# Channels of the observation
+VISIBLE, EXCAVATED, FLAGS = 0, 1, 2
+
+
+
+
+class VecMinesweeperEnv():
+    """ N Minesweeper games stepped together.  See the module docstring.
+
+        fog_probability plays every game by the JerkBoard rules: the hint of
+        a safe cell is hidden (-2) when its pre-sampled roll is under the
+        probability, and fogged zeros do not cascade.  rng (a seed or an
+        np.random.Generator) drives the mines and the fog
+    """
+
+    # Value of covered cells in the VISIBLE channel, as in Board
+    hidden_value = -4
+
+    # Value of a fogged hint, as returned by JerkBoard
+    fog_value = -2
+
+
+
+    def __init__(self, n, dim, num_mines, fog_probability=None, cascade=True,
+                 max_steps=None, rng=None):
+        self.n = n
+        self.dim = dim
+        self.num_actions = 2 * dim * dim
+        self.fog_probability = fog_probability
+        self.cascade = cascade
+        self.max_steps = max_steps
+
+        self.rng = as_generator(rng)
+        self.board = BatchBoard(n, dim, num_mines, rng=self.rng)
+        self.num_mines = self.board.num_mines
+
+        # What the agent has been shown, per game
+        self.visible = np.full((n, dim, dim), self.hidden_value, dtype=np.int8)
+
+        # Fog roll of every cell, drawn with the mines like JerkBoard.sample_fog()
+        self.fog_rolls = np.ones((n, dim, dim), dtype=np.float32)
+        if fog_probability is not None:
+            self.rng.random(out=self.fog_rolls, dtype=np.float32)
+
+        # Steps taken in the current game of each slot
+        self.steps = np.zeros(n, dtype=int)
+
+
+
+    def reset(self):
+        """ Starts a new game in every slot.  Returns the observation
+        """
+        self._reset_games(np.arange(self.n))
+        return self.observation()
+
+
+
+    def _reset_games(self, games):
+        """ Deals new games in the slots listed in games
+        """
+        self.board.reset(games)
+        if self.fog_probability is not None:
+            self.fog_rolls[games] = self.rng.random((len(games), self.dim, self.dim),
+                                                    dtype=np.float32)
+        self.visible[games] = self.hidden_value
+        self.steps[games] = 0
+
+
+
+    def observation(self):
+        """ Returns the (n, 3, dim, dim) int8 observation of every game
+        """
+        obs = np.empty((self.n, 3, self.dim, self.dim), dtype=np.int8)
+        obs[:, VISIBLE] = self.visible
+        obs[:, EXCAVATED] = self.board.excavated
+        obs[:, FLAGS] = self.board.flags
+        return obs
+
+
+
+    def valid_actions(self):
+        """ Returns an (n, num_actions) bool mask of the actions that change
+            something: selecting a covered, unflagged cell or toggling the
+            flag of a covered cell
+        """
+        covered = ~self.board.excavated.reshape(self.n, -1)
+        flags = self.board.flags.reshape(self.n, -1)
+        return np.concatenate([covered & ~flags, covered], axis=1)
+
+
+
+    def step(self, actions):
+        """ Takes one action in every game.  Returns (obs, reward, done, info).
+
+            reward is a float array and done a bool array over the games.
+            info['score'] holds the score of the games that finished (nan
+            elsewhere), info['truncated'] marks those cut off by max_steps and
+            info['final_observation'] their last observation
+        """
+        actions = np.asarray(actions, dtype=int).ravel()
+        if actions.shape != (self.n,):
+            raise ValueError("Expected {} actions, got {}".format(self.n, actions.shape[0]))
+        if np.any((actions < 0) | (actions >= self.num_actions)):
+            raise ValueError("Actions must be in [0, {})".format(self.num_actions))
+
+        board = self.board
+        before = board.correct_flags - board.incorrect_flags
+
+        cells = self.dim * self.dim
+        games = np.arange(self.n)
+        flag = actions >= cells
+        i, j = np.divmod(actions % cells, self.dim)
+
+        board.flag(games[flag], i[flag], j[flag])
+        self._select(games[~flag], i[~flag], j[~flag])
+
+        gained = board.correct_flags - board.incorrect_flags - before
+        reward = np.divide(gained, self.num_mines, out=np.zeros(self.n),
+                           where=self.num_mines > 0)
+
+        self.steps += 1
+        finished = board.gameover()
+        truncated = np.zeros(self.n, dtype=bool)
+        if self.max_steps is not None:
+            truncated = ~finished & (self.steps >= self.max_steps)
+        done = finished | truncated
+
+        obs = self.observation()
+        score = np.where(finished, board.score, np.nan)
+        info = {'score': score, 'truncated': truncated,
+                'final_observation': obs[done]}
+
+        # Finished games start over in place
+        if done.any():
+            reset = np.nonzero(done)[0]
+            self._reset_games(reset)
+            obs[reset, VISIBLE] = self.hidden_value
+            obs[reset, EXCAVATED:] = 0
+
+        return obs, reward, done, info
+
+
+
+    def _select(self, b, i, j):
+        """ Selects cell (i, j) of game b for every entry, then spreads the
+            zero cascade of all games at once, one ring of cells per pass
+        """
+        board = self.board
+
+        while len(b):
+            values = board.select(b, i, j)
+            ok = values != board.skipped_value
+            b, i, j, values = b[ok], i[ok], j[ok], values[ok]
+
+            # The fog hides the hints of safe cells whose roll is under the
+            #  probability
+            if self.fog_probability is not None:
+                fogged = (values >= 0) & (self.fog_rolls[b, i, j] <= self.fog_probability)
+                values[fogged] = self.fog_value
+            self.visible[b, i, j] = values
+
+            if not self.cascade:
+                return
+
+            # Covered, unflagged neighbors of the zeros revealed in this pass
+            zeros = np.zeros(board.excavated.shape, dtype=bool)
+            zeros[b[values == 0], i[values == 0], j[values == 0]] = True
+            spread = (neighbor_sum(zeros) > 0) & ~board.excavated & ~board.flags
+            b, i, j = np.nonzero(spread)